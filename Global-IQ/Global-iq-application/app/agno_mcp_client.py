@@ -3,15 +3,52 @@ MCP Client for Global IQ
 Connects Chainlit app to MCP prediction servers via HTTP
 """
 
+import asyncio
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import logging
+from functools import lru_cache
 from urllib.parse import urlparse
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=32)
+def _validated_url(url: str, server_name: str, allowed_hosts: frozenset) -> str:
+    """
+    Validate a server URL against the allowed hosts (memoized)
+
+    Server URLs rarely change between instances, so successful validations
+    are cached. Failures raise and are therefore never cached.
+
+    Raises:
+        ValueError: If URL is invalid or points to disallowed host
+    """
+    try:
+        parsed = urlparse(url)
+
+        # Check scheme
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"{server_name} URL must use http or https scheme")
+
+        # Check host
+        if parsed.hostname not in allowed_hosts:
+            raise ValueError(
+                f"{server_name} URL host '{parsed.hostname}' not in allowed hosts: {set(allowed_hosts)}"
+            )
+
+        # Check port is in valid range
+        if parsed.port is not None and (parsed.port < 1 or parsed.port > 65535):
+            raise ValueError(f"{server_name} URL port must be between 1 and 65535")
+
+        return url
+
+    except Exception as e:
+        logger.error(f"Invalid {server_name} URL: {url} - {str(e)}")
+        raise ValueError(f"Invalid {server_name} server URL: {str(e)}")
+
+
 class GlobalIQAgentSystem:
     """
     HTTP-based client for Global IQ MCP servers
@@ -43,6 +80,9 @@ class GlobalIQAgentSystem:
         self.policy_server_url = self._validate_url(policy_server_url, "policy")
         self.timeout = min(timeout, 30.0)  # Cap at 30 seconds
 
+        # Shared connection pool, built lazily inside the running event loop
+        self._client: Optional[httpx.AsyncClient] = None
+
         logger.info(f"MCP Client initialized - Compensation: {compensation_server_url}, Policy: {policy_server_url}")
 
     def _validate_url(self, url: str, server_name: str) -> str:
@@ -59,28 +99,38 @@ class GlobalIQAgentSystem:
         Raises:
             ValueError: If URL is invalid or points to disallowed host
         """
-        try:
-            parsed = urlparse(url)
+        return _validated_url(url, server_name, frozenset(self.ALLOWED_HOSTS))
 
-            # Check scheme
-            if parsed.scheme not in ("http", "https"):
-                raise ValueError(f"{server_name} URL must use http or https scheme")
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Return the shared HTTP client, creating it on first use
 
-            # Check host
-            if parsed.hostname not in self.ALLOWED_HOSTS:
-                raise ValueError(
-                    f"{server_name} URL host '{parsed.hostname}' not in allowed hosts: {self.ALLOWED_HOSTS}"
+        The client is created lazily so it binds to the event loop that is
+        actually running requests rather than whichever loop (if any) existed
+        when this object was constructed.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=15.0
                 )
+            )
+        return self._client
 
-            # Check port is in valid range
-            if parsed.port is not None and (parsed.port < 1 or parsed.port > 65535):
-                raise ValueError(f"{server_name} URL port must be between 1 and 65535")
-
-            return url
+    async def aclose(self):
+        """
+        Close the shared HTTP client and release pooled connections
 
-        except Exception as e:
-            logger.error(f"Invalid {server_name} URL: {url} - {str(e)}")
-            raise ValueError(f"Invalid {server_name} server URL: {str(e)}")
+        Called on app exit via MCPServiceManager.aclose from main.py's
+        ``on_app_shutdown`` hook, so keep-alive sockets are not leaked.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def predict_compensation(
         self,
@@ -125,16 +175,15 @@ class GlobalIQAgentSystem:
             }
 
             # Make HTTP POST request to compensation server
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.compensation_server_url}/predict",
-                    json=payload
-                )
-                response.raise_for_status()
+            response = await self._get_client().post(
+                f"{self.compensation_server_url}/predict",
+                json=payload
+            )
+            response.raise_for_status()
 
-                result = response.json()
-                logger.info("Compensation prediction successful")
-                return result
+            result = response.json()
+            logger.info("Compensation prediction successful")
+            return result
 
         except httpx.TimeoutException:
             logger.error(f"Compensation server timeout after {self.timeout}s")
@@ -158,6 +207,53 @@ class GlobalIQAgentSystem:
                 "message": "Unable to generate compensation prediction. Please try again later."
             }
 
+    async def predict_compensation_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Get several compensation predictions in one round trip
+
+        A single request goes to /predict as usual. Larger batches are posted
+        to /predict/batch; if the server does not provide that endpoint, or
+        its response is not one result per request, the requests are sent
+        individually in parallel instead.
+
+        Args:
+            requests: Keyword arguments for predict_compensation, one per prediction
+
+        Returns:
+            Prediction results in the same order as requests
+        """
+        if len(requests) == 1:
+            return [await self.predict_compensation(**requests[0])]
+
+        try:
+            logger.info(f"Requesting {len(requests)} compensation predictions in one batch")
+            response = await self._get_client().post(
+                f"{self.compensation_server_url}/predict/batch",
+                json=requests
+            )
+            if response.status_code != 404:
+                response.raise_for_status()
+                results = response.json()
+                if isinstance(results, list) and len(results) == len(requests):
+                    return results
+                logger.warning(
+                    "Batch endpoint returned a malformed response, sending requests individually"
+                )
+            else:
+                logger.info("Compensation server has no batch endpoint, sending requests individually")
+        except Exception as e:
+            logger.error(f"Batch compensation prediction failed: {str(e)}")
+            return [
+                {
+                    "status": "error",
+                    "error": "prediction_failed",
+                    "message": "Unable to generate compensation prediction. Please try again later."
+                }
+                for _ in requests
+            ]
+
+        return list(await asyncio.gather(*(self.predict_compensation(**r) for r in requests)))
+
     async def analyze_policy(
         self,
         origin_country: str,
@@ -192,16 +288,15 @@ class GlobalIQAgentSystem:
             }
 
             # Make HTTP POST request to policy server
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.policy_server_url}/analyze",
-                    json=payload
-                )
-                response.raise_for_status()
+            response = await self._get_client().post(
+                f"{self.policy_server_url}/analyze",
+                json=payload
+            )
+            response.raise_for_status()
 
-                result = response.json()
-                logger.info("Policy analysis successful")
-                return result
+            result = response.json()
+            logger.info("Policy analysis successful")
+            return result
 
         except httpx.TimeoutException:
             logger.error(f"Policy server timeout after {self.timeout}s")
@@ -225,9 +320,52 @@ class GlobalIQAgentSystem:
                 "message": "Unable to complete policy analysis. Please try again later."
             }
 
-    def health_check(self) -> Dict[str, bool]:
+    async def predict_both(
+        self,
+        compensation_params: Dict[str, Any],
+        policy_params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Check health of both MCP servers (synchronous)
+        Run compensation prediction and policy analysis concurrently
+
+        Both requests go out through the shared connection pool, so total
+        latency is that of the slower call rather than the sum of both.
+
+        Args:
+            compensation_params: Keyword arguments for predict_compensation
+            policy_params: Keyword arguments for analyze_policy
+
+        Returns:
+            Tuple of (compensation result, policy result). Each element is a
+            result dict; errors are reported in the same structured form the
+            individual methods use.
+        """
+        compensation, policy = await asyncio.gather(
+            self.predict_compensation(**compensation_params),
+            self.analyze_policy(**policy_params),
+            return_exceptions=True
+        )
+
+        if isinstance(compensation, BaseException):
+            logger.error(f"Compensation prediction failed: {compensation}")
+            compensation = {
+                "status": "error",
+                "error": "prediction_failed",
+                "message": "Unable to generate compensation prediction. Please try again later."
+            }
+        if isinstance(policy, BaseException):
+            logger.error(f"Policy analysis failed: {policy}")
+            policy = {
+                "status": "error",
+                "error": "analysis_failed",
+                "message": "Unable to complete policy analysis. Please try again later."
+            }
+
+        return compensation, policy
+
+    async def health_check(self) -> Dict[str, bool]:
+        """
+        Check health of both MCP servers concurrently
 
         Returns:
             Dict with health status of each server:
@@ -236,31 +374,26 @@ class GlobalIQAgentSystem:
                 "policy_server": bool
             }
         """
-        import requests
+        return await self._check_servers(self._get_client())
 
-        status = {
-            "compensation_server": False,
-            "policy_server": False
+    async def _check_servers(self, client: httpx.AsyncClient) -> Dict[str, bool]:
+        """Probe both /health endpoints in parallel using the given client"""
+        servers = {
+            "compensation_server": self.compensation_server_url,
+            "policy_server": self.policy_server_url
         }
 
-        # Check compensation server
-        try:
-            response = requests.get(
-                f"{self.compensation_server_url}/health",
-                timeout=2.0
-            )
-            status["compensation_server"] = (response.status_code == 200)
-        except Exception as e:
-            logger.debug(f"Compensation server health check failed: {e}")
-
-        # Check policy server
-        try:
-            response = requests.get(
-                f"{self.policy_server_url}/health",
-                timeout=2.0
-            )
-            status["policy_server"] = (response.status_code == 200)
-        except Exception as e:
-            logger.debug(f"Policy server health check failed: {e}")
+        responses = await asyncio.gather(
+            *(client.get(f"{url}/health", timeout=2.0) for url in servers.values()),
+            return_exceptions=True
+        )
+
+        status = {}
+        for name, response in zip(servers, responses):
+            if isinstance(response, BaseException):
+                logger.debug(f"{name} health check failed: {response}")
+                status[name] = False
+            else:
+                status[name] = (response.status_code == 200)
 
         return status
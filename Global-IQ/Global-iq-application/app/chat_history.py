@@ -1,74 +1,232 @@
 """
 Chat History Management for Global IQ Mobility Advisor
 Provides multi-chat functionality and conversation persistence
+
+Storage layout (under CHAT_HISTORY_DIR):
+    {user_id}_chats.json        - index of the user's chats (titles, metadata)
+    {user_id}/{chat_id}.ndjson  - append-only message log, one JSON object per line
 """
 
+import atexit
+import heapq
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-import uuid
+import time
+from datetime import datetime, timezone
+from secrets import token_hex
+from typing import Dict, List, Optional, Any, Set
 import chainlit as cl
-from auth import get_current_user
+
+try:
+    import orjson  # Optional: much faster JSON encode/decode
+except ImportError:
+    orjson = None
 
 # Directory to store chat histories
 CHAT_HISTORY_DIR = "chat_histories"
 
+# Index updates from message appends are written to disk in batches: after this
+# many unsaved messages, or once the oldest unsaved change is this many seconds old
+FLUSH_EVERY_N_MESSAGES = 10
+FLUSH_INTERVAL_SECONDS = 5.0
+
+# History files are written compactly unless pretty-printing is requested
+PRETTY_PRINT_HISTORY = os.getenv("CHAT_HISTORY_PRETTY", "false").lower() == "true"
+
+# Chunk size used when reading a message log backwards for its last entry
+LOG_TAIL_BLOCK_SIZE = 4096
+
+
+def _dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(raw: bytes) -> Any:
+    """Deserialize JSON bytes, using orjson when available"""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def _to_utc_iso(timestamp: Any) -> Any:
+    """Rewrite an ISO timestamp as UTC; naive values (older files) are taken as local time"""
+    try:
+        return datetime.fromisoformat(timestamp).astimezone(timezone.utc).isoformat()
+    except (TypeError, ValueError):
+        return timestamp
+
+
 class ChatHistoryManager:
     """Manages multiple chat conversations for users"""
     
     def __init__(self):
+        # Per-user chat data, populated on first load and kept in sync on save
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Users with in-memory changes not yet written to disk
+        self._dirty: Set[str] = set()
+        self._unsaved_messages = 0
+        self._dirty_since: Optional[float] = None
         self.ensure_history_directory()
     
     def ensure_history_directory(self):
         """Create chat history directory if it doesn't exist"""
-        if not os.path.exists(CHAT_HISTORY_DIR):
-            os.makedirs(CHAT_HISTORY_DIR)
+        os.makedirs(CHAT_HISTORY_DIR, exist_ok=True)
     
     def get_user_history_file(self, user_id: str) -> str:
         """Get the path to a user's chat history file"""
         return os.path.join(CHAT_HISTORY_DIR, f"{user_id}_chats.json")
     
+    def get_user_log_dir(self, user_id: str) -> str:
+        """Get the directory holding a user's per-chat message logs"""
+        return os.path.join(CHAT_HISTORY_DIR, user_id)
+    
+    def get_chat_log_file(self, user_id: str, chat_id: str) -> str:
+        """Get the path to a chat's append-only message log"""
+        return os.path.join(self.get_user_log_dir(user_id), f"{chat_id}.ndjson")
+    
     def load_user_chats(self, user_id: str) -> Dict[str, Any]:
-        """Load all chat conversations for a user"""
+        """Load all chat conversations for a user (served from memory after first read)"""
+        chat_data = self._cache.get(user_id)
+        if chat_data is None:
+            chat_data = self._read_user_chats(user_id)
+            self._cache[user_id] = chat_data
+        return chat_data
+    
+    def _read_user_chats(self, user_id: str) -> Dict[str, Any]:
+        """Read a user's chat history file from disk"""
         history_file = self.get_user_history_file(user_id)
         
-        if not os.path.exists(history_file):
-            return {
-                "user_id": user_id,
-                "chats": {},
-                "active_chat_id": None,
-                "created_at": datetime.now().isoformat()
-            }
-        
         try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(history_file, 'rb') as f:
+                chat_data = _loads(f.read())
+            changed = self._migrate_inline_messages(user_id, chat_data)
+            changed = self._reconcile_message_counts(user_id, chat_data) or changed
+            if changed:
+                self._write_user_chats(user_id, chat_data)
+            return chat_data
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"Error loading chat history for {user_id}: {e}")
-            return {
-                "user_id": user_id,
-                "chats": {},
-                "active_chat_id": None,
-                "created_at": datetime.now().isoformat()
-            }
+        
+        return {
+            "user_id": user_id,
+            "chats": {},
+            "active_chat_id": None,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
     
     def save_user_chats(self, user_id: str, chat_data: Dict[str, Any]):
-        """Save all chat conversations for a user"""
+        """Save all chat conversations for a user (updates the cache and writes through to disk)"""
+        self._cache[user_id] = chat_data
+        self._dirty.discard(user_id)
+        self._write_user_chats(user_id, chat_data)
+    
+    def _write_user_chats(self, user_id: str, chat_data: Dict[str, Any]):
+        """Atomically replace a user's history file so a crash never leaves it half-written"""
         history_file = self.get_user_history_file(user_id)
+        tmp_file = history_file + ".tmp"
         
         try:
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, indent=2, ensure_ascii=False)
+            data = _dumps(chat_data, pretty=PRETTY_PRINT_HISTORY)
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, history_file)
         except Exception as e:
             print(f"Error saving chat history for {user_id}: {e}")
     
+    def _append_to_log(self, user_id: str, chat_id: str, messages: List[Dict[str, Any]]):
+        """Append messages to a chat's log file, one JSON document per line"""
+        os.makedirs(self.get_user_log_dir(user_id), exist_ok=True)
+        with open(self.get_chat_log_file(user_id, chat_id), 'ab') as f:
+            f.write(b"".join(_dumps(message) + b"\n" for message in messages))
+    
+    def _migrate_inline_messages(self, user_id: str, chat_data: Dict[str, Any]) -> bool:
+        """
+        Move messages stored inside an older index file into per-chat logs
+        
+        Older files also hold naive local timestamps; these are rewritten as
+        UTC so they sort correctly against newer records in list_user_chats.
+        """
+        migrated = False
+        for chat_id, chat in chat_data["chats"].items():
+            messages = chat.pop("messages", None)
+            if messages is None:
+                continue
+            migrated = True
+            for key in ("created_at", "updated_at"):
+                if key in chat:
+                    chat[key] = _to_utc_iso(chat[key])
+            for message in messages:
+                if "timestamp" in message:
+                    message["timestamp"] = _to_utc_iso(message["timestamp"])
+            if messages and not os.path.exists(self.get_chat_log_file(user_id, chat_id)):
+                self._append_to_log(user_id, chat_id, messages)
+        
+        if migrated and "created_at" in chat_data:
+            chat_data["created_at"] = _to_utc_iso(chat_data["created_at"])
+        return migrated
+    
+    def _count_log_messages(self, user_id: str, chat_id: str) -> int:
+        """Count the entries in a chat's log (one per newline-terminated line)"""
+        count = 0
+        try:
+            with open(self.get_chat_log_file(user_id, chat_id), 'rb') as f:
+                for block in iter(lambda: f.read(LOG_TAIL_BLOCK_SIZE * 16), b""):
+                    count += block.count(b"\n")
+        except FileNotFoundError:
+            pass
+        return count
+    
+    def _reconcile_message_counts(self, user_id: str, chat_data: Dict[str, Any]) -> bool:
+        """
+        Bring index metadata back in line with the message logs
+        
+        Index writes are batched, so a process that stops before flushing
+        leaves message_count (and updated_at) behind the log, which is always
+        appended first.
+        """
+        reconciled = False
+        for chat_id, chat in chat_data["chats"].items():
+            count = self._count_log_messages(user_id, chat_id)
+            if chat["metadata"].get("message_count") == count:
+                continue
+            reconciled = True
+            chat["metadata"]["message_count"] = count
+            last_message = self._read_last_message(user_id, chat_id)
+            if last_message and last_message.get("timestamp"):
+                chat["updated_at"] = last_message["timestamp"]
+        return reconciled
+    
+    def _mark_dirty(self, user_id: str):
+        """Record an unsaved message and flush once a batch threshold is reached"""
+        self._dirty.add(user_id)
+        self._unsaved_messages += 1
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        
+        if (self._unsaved_messages >= FLUSH_EVERY_N_MESSAGES
+                or now - self._dirty_since >= FLUSH_INTERVAL_SECONDS):
+            self.flush()
+    
+    def flush(self):
+        """Write all pending in-memory changes to disk"""
+        dirty, self._dirty = self._dirty, set()
+        self._unsaved_messages = 0
+        self._dirty_since = None
+        for user_id in dirty:
+            self._write_user_chats(user_id, self._cache[user_id])
+    
     def create_new_chat(self, user_id: str, title: str = None, chat_type: str = "general") -> str:
         """Create a new chat conversation"""
         chat_data = self.load_user_chats(user_id)
         
-        # Generate unique chat ID
-        chat_id = str(uuid.uuid4())
+        # Generate unique chat ID (32 hex chars, same entropy as a uuid4)
+        chat_id = token_hex(16)
         
         # Create default title if none provided
         if not title:
@@ -76,13 +234,13 @@ class ChatHistoryManager:
             title = f"Chat {chat_count}"
         
         # Create new chat
+        now_iso = datetime.now(timezone.utc).isoformat()
         new_chat = {
             "id": chat_id,
             "title": title,
             "type": chat_type,  # "general", "policy", "compensation"
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
-            "messages": [],
+            "created_at": now_iso,
+            "updated_at": now_iso,
             "metadata": {
                 "message_count": 0,
                 "last_agent_type": None
@@ -99,7 +257,7 @@ class ChatHistoryManager:
         return chat_id
     
     def get_chat(self, user_id: str, chat_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific chat conversation"""
+        """Get a specific chat's index entry (use get_chat_messages for its messages)"""
         chat_data = self.load_user_chats(user_id)
         return chat_data["chats"].get(chat_id)
     
@@ -109,7 +267,7 @@ class ChatHistoryManager:
         return chat_data.get("active_chat_id")
     
     def set_active_chat(self, user_id: str, chat_id: str) -> bool:
-        """Set the active chat for a user"""
+        """Set the active chat for a user (also persists any pending messages)"""
         chat_data = self.load_user_chats(user_id)
         
         if chat_id not in chat_data["chats"]:
@@ -117,6 +275,7 @@ class ChatHistoryManager:
         
         chat_data["active_chat_id"] = chat_id
         self.save_user_chats(user_id, chat_data)
+        self.flush()
         return True
     
     def add_message_to_chat(self, user_id: str, chat_id: str, role: str, content: str, metadata: Dict = None):
@@ -127,38 +286,78 @@ class ChatHistoryManager:
             return False
         
         # Create message
+        now_iso = datetime.now(timezone.utc).isoformat()
         message = {
-            "id": str(uuid.uuid4()),
+            "id": token_hex(16),
             "role": role,  # "user", "assistant", "system"
             "content": content,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso,
             "metadata": metadata or {}
         }
         
-        # Add to chat
-        chat_data["chats"][chat_id]["messages"].append(message)
-        chat_data["chats"][chat_id]["updated_at"] = datetime.now().isoformat()
+        # Append to the chat's log; only the small index entry changes in memory
+        try:
+            self._append_to_log(user_id, chat_id, [message])
+        except Exception as e:
+            print(f"Error writing message log for {user_id}/{chat_id}: {e}")
+            return False
+        
+        chat_data["chats"][chat_id]["updated_at"] = now_iso
         chat_data["chats"][chat_id]["metadata"]["message_count"] += 1
         
         # Update last agent type if this was a routing decision
         if metadata and "agent_type" in metadata:
             chat_data["chats"][chat_id]["metadata"]["last_agent_type"] = metadata["agent_type"]
         
-        # Save to file
-        self.save_user_chats(user_id, chat_data)
+        # Defer the index write; index updates are flushed to disk in batches
+        self._mark_dirty(user_id)
         return True
     
     def get_chat_messages(self, user_id: str, chat_id: str) -> List[Dict[str, Any]]:
         """Get all messages from a specific chat"""
-        chat = self.get_chat(user_id, chat_id)
-        if not chat:
+        if not self.get_chat(user_id, chat_id):
+            return []
+        
+        try:
+            with open(self.get_chat_log_file(user_id, chat_id), 'rb') as f:
+                return [_loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
             return []
-        return chat["messages"]
     
-    def list_user_chats(self, user_id: str) -> List[Dict[str, Any]]:
-        """List all chats for a user"""
+    def _read_last_message(self, user_id: str, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Read only the final entry of a chat's log, scanning back from the end"""
+        try:
+            with open(self.get_chat_log_file(user_id, chat_id), 'rb') as f:
+                pos = f.seek(0, os.SEEK_END)
+                tail = b""
+                while pos > 0:
+                    step = min(LOG_TAIL_BLOCK_SIZE, pos)
+                    pos -= step
+                    f.seek(pos)
+                    tail = f.read(step) + tail
+                    # Stop once the last non-empty line is known to be complete
+                    if b"\n" in tail.rstrip():
+                        break
+        except FileNotFoundError:
+            return None
+        
+        last_line = tail.rstrip().rsplit(b"\n", 1)[-1]
+        return _loads(last_line) if last_line else None
+    
+    def list_user_chats(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        List chats for a user, most recently updated first
+        
+        Args:
+            user_id: User whose chats to list
+            limit: If given, return only the `limit` most recent chats
+        """
         chat_data = self.load_user_chats(user_id)
         
+        # Partial sort when only the top few are needed (e.g. a sidebar)
+        if limit is not None:
+            return heapq.nlargest(limit, chat_data["chats"].values(), key=lambda x: x["updated_at"])
+        
         # Convert to list and sort by updated_at (most recent first)
         chats = list(chat_data["chats"].values())
         chats.sort(key=lambda x: x["updated_at"], reverse=True)
@@ -180,10 +379,40 @@ class ChatHistoryManager:
             remaining_chats = list(chat_data["chats"].keys())
             chat_data["active_chat_id"] = remaining_chats[0] if remaining_chats else None
         
-        # Save to file
+        # Save to file, then drop the chat's message log
         self.save_user_chats(user_id, chat_data)
+        self._remove_log(user_id, chat_id)
         return True
     
+    def _remove_log(self, user_id: str, chat_id: str):
+        """Delete a chat's message log if it exists"""
+        try:
+            os.remove(self.get_chat_log_file(user_id, chat_id))
+        except FileNotFoundError:
+            pass
+    
+    def compact_user_logs(self, user_id: str) -> int:
+        """
+        Remove message logs that no longer belong to a chat in the user's index
+        (e.g. left behind if the process stopped mid-delete)
+        
+        Returns:
+            Number of orphaned log files removed
+        """
+        chat_ids = self.load_user_chats(user_id)["chats"].keys()
+        try:
+            log_names = os.listdir(self.get_user_log_dir(user_id))
+        except FileNotFoundError:
+            return 0
+        
+        removed = 0
+        for name in log_names:
+            chat_id, ext = os.path.splitext(name)
+            if ext == ".ndjson" and chat_id not in chat_ids:
+                self._remove_log(user_id, chat_id)
+                removed += 1
+        return removed
+    
     def rename_chat(self, user_id: str, chat_id: str, new_title: str) -> bool:
         """Rename a specific chat"""
         chat_data = self.load_user_chats(user_id)
@@ -192,7 +421,7 @@ class ChatHistoryManager:
             return False
         
         chat_data["chats"][chat_id]["title"] = new_title
-        chat_data["chats"][chat_id]["updated_at"] = datetime.now().isoformat()
+        chat_data["chats"][chat_id]["updated_at"] = datetime.now(timezone.utc).isoformat()
         
         self.save_user_chats(user_id, chat_data)
         return True
@@ -203,7 +432,10 @@ class ChatHistoryManager:
         if not chat:
             return {}
         
-        last_message = chat["messages"][-1] if chat["messages"] else None
+        last_message = self._read_last_message(user_id, chat_id)
+        content = last_message["content"] if last_message else None
+        if content and len(content) > 100:
+            content = content[:100] + "…"
         
         return {
             "id": chat["id"],
@@ -211,11 +443,12 @@ class ChatHistoryManager:
             "type": chat["type"],
             "created_at": chat["created_at"],
             "updated_at": chat["updated_at"],
-            "message_count": len(chat["messages"]),
-            "last_message": last_message["content"][:100] + "..." if last_message and len(last_message["content"]) > 100 else last_message["content"] if last_message else None,
+            "message_count": chat["metadata"]["message_count"],
+            "last_message": content,
             "last_message_role": last_message["role"] if last_message else None,
             "last_agent_type": chat["metadata"].get("last_agent_type")
         }
 
 # Global instance
 chat_manager = ChatHistoryManager()
+atexit.register(chat_manager.flush)
@@ -7,8 +7,83 @@ and only asks for missing required fields
 """
 
 from openai import AsyncOpenAI
+import copy
+import hashlib
 import json
-from typing import Dict, List, Tuple, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Optional
+
+try:
+    import orjson  # Optional: much faster JSON decode
+except ImportError:
+    orjson = None
+
+# Maximum number of extraction results kept in memory per collector
+EXTRACTION_CACHE_SIZE = 512
+
+# Chat model used for extraction and follow-up messages
+CHAT_MODEL = "gpt-4o"
+
+
+def _loads(raw: str) -> Any:
+    """Deserialize JSON, using orjson when available"""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+# Prompt used to extract required fields; filled in with str.format
+EXTRACTION_PROMPT_TEMPLATE = """You are an intelligent data extraction assistant for an HR global mobility system.
+
+The user is an HR professional describing an employee relocation scenario. Extract information from their message to fill in these required fields:
+
+{fields_list}
+
+User's message: "{user_message}"{context}
+
+Analyze the message and extract any information that matches these fields. Be intelligent about inference:
+- If they mention a city, infer the country if obvious (e.g., "Chicago" = "Chicago, USA")
+- Parse salary formats (100k, $100,000, etc.)
+- Understand duration (2 years, 24 months, etc.)
+- Infer assignment type from context
+- Recognize third-person descriptions (e.g., "moving someone from Chicago" means Chicago is the origin)
+- Family size should include the employee (e.g., "1 kid" = family of 2)
+
+Return a JSON object with this EXACT structure:
+{{
+    "extracted_fields": {{
+        "Field Name": "extracted value or null if not found"
+    }},
+    "confidence": {{
+        "Field Name": 0.0-1.0 confidence score
+    }},
+    "missing_fields": ["Field Name 1", "Field Name 2"],
+    "clarifications_needed": [
+        {{
+            "field": "Field Name",
+            "question": "Natural follow-up question to ask user",
+            "reason": "Why we need this information"
+        }}
+    ]
+}}"""
+
+# Fixed instructions for follow-up messages. They are sent ahead of the
+# per-turn data so every follow-up for a route starts with the same prefix,
+# which lets the API reuse its prompt cache across turns.
+FOLLOW_UP_INSTRUCTIONS = """Generate a BRIEF, conversational follow-up message for an HR global mobility assistant chatbot.
+
+The HR professional is describing an employee relocation. You will be given the information they have provided so far and the details we still need.
+
+Generate a SHORT, friendly chat message (2-4 sentences MAX) that:
+1. Briefly acknowledges what we've received (if anything)
+2. Asks for the missing information naturally in a bulleted list
+3. Uses professional third-person language (e.g., "What is the employee's role?" not "What's your role?")
+4. Sounds like a helpful chatbot, NOT a formal business email
+
+Example style: "Thanks! I've captured the origin and destination. To continue, I'll need a few more details: • What is the employee's current salary? • How long will the assignment be? • ..."
+
+Return ONLY the message text, no JSON, no subject line, no signature.
+
+Fields collected for this assessment:
+{fields_list}"""
 
 
 class ConversationalCollector:
@@ -17,6 +92,10 @@ class ConversationalCollector:
     def __init__(self, openai_client: AsyncOpenAI):
         self.client = openai_client
 
+        # LRU cache of parsed extraction results, keyed by a hash of the
+        # route, user message and conversation context sent to the model
+        self._extract_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
         # Define required fields for each route
         self.required_fields = {
             "compensation": {
@@ -36,13 +115,35 @@ class ConversationalCollector:
                 "Job Title": "Employee's job title or position"
             }
         }
+        # Combined route collects both sets once, then runs both analyses together
+        self.required_fields["both_policy_and_compensation"] = {
+            **self.required_fields["compensation"],
+            **self.required_fields["policy"]
+        }
+
+        # Pre-render the field bullet list for each route's extraction prompt
+        self._fields_list = {
+            route: "\n".join(f"- **{field}**: {desc}" for field, desc in fields.items())
+            for route, fields in self.required_fields.items()
+        }
+
+        # Required field names per route, for set-based completeness checks
+        self._required_field_sets = {
+            route: frozenset(fields) for route, fields in self.required_fields.items()
+        }
+
+        # Static system prompt for each route's follow-up messages
+        self._follow_up_instructions = {
+            route: FOLLOW_UP_INSTRUCTIONS.format(fields_list=fields_list)
+            for route, fields_list in self._fields_list.items()
+        }
 
     async def start_conversation(self, route: str) -> str:
         """
         Start the conversational intake
 
         Args:
-            route: The route name (compensation or policy)
+            route: The route name (compensation, policy or both_policy_and_compensation)
 
         Returns:
             Initial prompt asking user to describe their situation
@@ -70,6 +171,18 @@ Tell me about your international assignment. Include details like:
 
 **Describe your situation naturally - I'll ask for any missing details!**"""
 
+        elif route == "both_policy_and_compensation":
+            return """🎯 **Let's cover both policy and compensation!**
+
+Tell me about the relocation. Include details like:
+- Where you're moving from and to
+- Your current salary
+- What type of assignment it is and how long it will last
+- If family is coming with you
+- Your role/position
+
+**Describe your situation naturally - I'll ask for anything missing, then run both analyses together!**"""
+
         else:
             return "Tell me about your situation and I'll help gather the information we need!"
 
@@ -92,66 +205,27 @@ Tell me about your international assignment. Include details like:
         """
         required = self.required_fields.get(route, {})
 
-        # Build extraction prompt
-        fields_list = "\n".join([f"- **{field}**: {desc}" for field, desc in required.items()])
+        context = self._history_context(conversation_history)
 
-        context = ""
-        if conversation_history:
-            context = "\n\nPrevious conversation:\n"
-            for msg in conversation_history[-3:]:  # Last 3 messages for context
-                context += f"{msg['role']}: {msg['content']}\n"
-
-        extraction_prompt = f"""You are an intelligent data extraction assistant for an HR global mobility system.
-
-The user is an HR professional describing an employee relocation scenario. Extract information from their message to fill in these required fields:
-
-{fields_list}
-
-User's message: "{user_message}"{context}
-
-Analyze the message and extract any information that matches these fields. Be intelligent about inference:
-- If they mention a city, infer the country if obvious (e.g., "Chicago" = "Chicago, USA")
-- Parse salary formats (100k, $100,000, etc.)
-- Understand duration (2 years, 24 months, etc.)
-- Infer assignment type from context
-- Recognize third-person descriptions (e.g., "moving someone from Chicago" means Chicago is the origin)
-- Family size should include the employee (e.g., "1 kid" = family of 2)
-
-Return a JSON object with this EXACT structure:
-{{
-    "extracted_fields": {{
-        "Field Name": "extracted value or null if not found"
-    }},
-    "confidence": {{
-        "Field Name": 0.0-1.0 confidence score
-    }},
-    "missing_fields": ["Field Name 1", "Field Name 2"],
-    "clarifications_needed": [
-        {{
-            "field": "Field Name",
-            "question": "Natural follow-up question to ask user",
-            "reason": "Why we need this information"
-        }}
-    ]
-}}
-
-IMPORTANT: Return ONLY valid JSON, no other text."""
+        # Identical inputs (retries, re-sent messages) reuse the earlier result
+        cache_key = hashlib.blake2b(
+            "\x00".join((route, user_message, context)).encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        cached = self._extract_cache.get(cache_key)
+        if cached is not None:
+            self._extract_cache.move_to_end(cache_key)
+            return copy.deepcopy(cached)
 
         response = await self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": extraction_prompt}],
-            temperature=0.3
+            **self._extraction_request(route, user_message, context)
         )
 
         result_text = response.choices[0].message.content
 
-        # Parse JSON response
+        # JSON mode guarantees the whole response is a JSON object
         try:
-            start_idx = result_text.find('{')
-            end_idx = result_text.rfind('}') + 1
-            json_str = result_text[start_idx:end_idx]
-            result = json.loads(json_str)
-            return result
+            result = _loads(result_text)
         except Exception as e:
             print(f"Error parsing extraction result: {e}")
             return {
@@ -161,6 +235,58 @@ IMPORTANT: Return ONLY valid JSON, no other text."""
                 "clarifications_needed": []
             }
 
+        # Only successful parses are cached so failures are retried next turn
+        self._extract_cache[cache_key] = copy.deepcopy(result)
+        if len(self._extract_cache) > EXTRACTION_CACHE_SIZE:
+            self._extract_cache.popitem(last=False)
+        return result
+
+    def build_extraction_request(
+        self,
+        route: str,
+        user_message: str,
+        conversation_history: List[Dict] = None
+    ) -> Dict:
+        """
+        Build the chat completion parameters extract_information would send
+
+        Lets offline jobs (e.g. Batch API submissions) use exactly the same
+        prompt and settings as the interactive path.
+
+        Args:
+            route: compensation or policy
+            user_message: User's description
+            conversation_history: Previous messages for context
+
+        Returns:
+            Keyword arguments for chat.completions.create
+        """
+        return self._extraction_request(
+            route, user_message, self._history_context(conversation_history)
+        )
+
+    def _history_context(self, conversation_history: Optional[List[Dict]]) -> str:
+        """Render the last 3 messages of history as prompt context"""
+        if not conversation_history:
+            return ""
+        return "\n\nPrevious conversation:\n" + "".join(
+            f"{msg['role']}: {msg['content']}\n" for msg in conversation_history[-3:]
+        )
+
+    def _extraction_request(self, route: str, user_message: str, context: str) -> Dict:
+        """Chat completion parameters for an extraction prompt"""
+        extraction_prompt = EXTRACTION_PROMPT_TEMPLATE.format(
+            fields_list=self._fields_list.get(route, ""),
+            user_message=user_message,
+            context=context
+        )
+        return {
+            "model": CHAT_MODEL,
+            "messages": [{"role": "user", "content": extraction_prompt}],
+            "temperature": 0.3,
+            "response_format": {"type": "json_object"}
+        }
+
     async def generate_follow_up(
         self,
         route: str,
@@ -196,27 +322,21 @@ IMPORTANT: Return ONLY valid JSON, no other text."""
         # Ask for missing fields naturally
         missing_descriptions = [f"- {required[field]}" for field in missing_fields if field in required]
 
-        prompt = f"""Generate a BRIEF, conversational follow-up message for an HR global mobility assistant chatbot.
+        instructions = self._follow_up_instructions.get(route) or FOLLOW_UP_INSTRUCTIONS.format(fields_list="")
 
-The HR professional has provided this information about the employee relocation:
+        # Only this part changes between turns, so it goes last
+        prompt = f"""The HR professional has provided this information about the employee relocation:
 {captured_text}
 
 We still need:
-{chr(10).join(missing_descriptions)}
-
-Generate a SHORT, friendly chat message (2-4 sentences MAX) that:
-1. Briefly acknowledges what we've received (if anything)
-2. Asks for the missing information naturally in a bulleted list
-3. Uses professional third-person language (e.g., "What is the employee's role?" not "What's your role?")
-4. Sounds like a helpful chatbot, NOT a formal business email
-
-Example style: "Thanks! I've captured the origin and destination. To continue, I'll need a few more details: • What is the employee's current salary? • How long will the assignment be? • ..."
-
-Return ONLY the message text, no JSON, no subject line, no signature."""
+{chr(10).join(missing_descriptions)}"""
 
         response = await self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt}
+            ],
             temperature=0.7
         )
 
@@ -236,13 +356,8 @@ Return ONLY the message text, no JSON, no subject line, no signature."""
 
     def is_complete(self, extracted_data: Dict, route: str) -> bool:
         """Check if all required fields are collected"""
-        required = self.required_fields.get(route, {})
-
-        for field in required.keys():
-            if field not in extracted_data or not extracted_data[field]:
-                return False
-
-        return True
+        filled = {field for field, value in extracted_data.items() if value}
+        return not (self._required_field_sets.get(route, frozenset()) - filled)
 
     def format_for_mcp(self, route: str, collected_data: Dict) -> Dict:
         """
@@ -3,6 +3,7 @@
 # --- Imports ---
 import chainlit as cl
 from openai import AsyncOpenAI
+import httpx
 import os
 from dotenv import load_dotenv
 import fitz  # PyMuPDF for PDFs
@@ -16,6 +17,7 @@ from input_collector import InputCollector
 from conversational_collector import ConversationalCollector
 from typing import Optional
 import hashlib
+import hmac
 # Data persistence imports
 from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
 
@@ -33,28 +35,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# --- Password Hashing ---
+def hash_password(password: str) -> str:
+    """
+    Hash a password for storage and comparison in USERS_DB.
+    Every stored hash and login check goes through here, so this is the one
+    place to change if the hashing scheme changes.
+    """
+    return hashlib.sha256(password.encode()).hexdigest()
+
 # --- User Database (In production, use a proper database) ---
 USERS_DB = {
     "admin": {
-        "password_hash": hashlib.sha256("admin123".encode()).hexdigest(),
+        "password_hash": hash_password("admin123"),
         "role": "admin",
         "name": "Administrator",
         "email": "admin@globaliq.com"
     },
     "hr_manager": {
-        "password_hash": hashlib.sha256("hr2024".encode()).hexdigest(),
+        "password_hash": hash_password("hr2024"),
         "role": "hr_manager",
         "name": "HR Manager",
         "email": "hr@globaliq.com"
     },
     "employee": {
-        "password_hash": hashlib.sha256("employee123".encode()).hexdigest(),
+        "password_hash": hash_password("employee123"),
         "role": "employee",
         "name": "Employee User",
         "email": "employee@globaliq.com"
     },
     "demo": {
-        "password_hash": hashlib.sha256("demo".encode()).hexdigest(),
+        "password_hash": hash_password("demo"),
         "role": "demo",
         "name": "Demo User",
         "email": "demo@globaliq.com"
@@ -69,11 +80,11 @@ def auth_callback(username: str, password: str) -> Optional[cl.User]:
     Returns a cl.User object if authentication is successful, None otherwise.
     """
     # Hash the provided password
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    password_hash = hash_password(password)
     
-    # Check if user exists and password matches
-    if username in USERS_DB and USERS_DB[username]["password_hash"] == password_hash:
-        user_data = USERS_DB[username]
+    # Check if user exists and password matches (constant-time comparison)
+    user_data = USERS_DB.get(username)
+    if user_data and hmac.compare_digest(user_data["password_hash"], password_hash):
         return cl.User(
             identifier=username,
             metadata={
@@ -86,7 +97,25 @@ def auth_callback(username: str, password: str) -> Optional[cl.User]:
     return None
 
 # --- Initialize OpenAI Client ---
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def build_openai_client() -> AsyncOpenAI:
+    """
+    Build the OpenAI client shared by every collector and service.
+
+    The default httpx pool keeps very few idle connections, which serializes
+    requests once several Chainlit sessions are active at the same time.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=1000,
+            max_keepalive_connections=100,
+            keepalive_expiry=30.0
+        ),
+        http2=True
+    )
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+
+client = build_openai_client()
 cl.instrument_openai()
 
 # --- Initialize Enhanced Agent Router ---
@@ -262,45 +291,67 @@ FILE_HANDLERS = {
 }
 
 # --- Calculation Functions (MCP Integration) ---
-async def _run_compensation_calculation(collected_data: dict, extracted_texts: list) -> str:
+async def _run_compensation_calculation(collected_data: dict, extracted_texts: list):
     """
-    Run compensation calculation via MCP Service Manager.
+    Run compensation calculation via MCP Service Manager and stream it to the user.
     Uses MCP servers if available, falls back to GPT-4.
     """
+    msg = cl.Message(content="")
     try:
         logger.info(f"Starting compensation calculation for: {collected_data.get('Destination Location', 'Unknown')}")
 
         # Use service manager (handles MCP + fallback)
-        result = await mcp_service_manager.predict_compensation(
+        async for token in mcp_service_manager.stream_compensation(
             collected_data=collected_data,
             extracted_texts=extracted_texts
-        )
-
-        return result
+        ):
+            await msg.stream_token(token)
 
     except Exception as e:
         logger.error(f"Compensation calculation failed: {str(e)}")
-        return f"Sorry, I encountered an error during compensation calculation: {str(e)}"
+        msg.content = f"Sorry, I encountered an error during compensation calculation: {str(e)}"
 
-async def _run_policy_analysis(collected_data: dict, extracted_texts: list) -> str:
+    await msg.send()
+
+async def _run_policy_analysis(collected_data: dict, extracted_texts: list):
     """
-    Run policy analysis via MCP Service Manager.
+    Run policy analysis via MCP Service Manager and stream it to the user.
     Uses MCP servers if available, falls back to GPT-4.
     """
+    msg = cl.Message(content="")
     try:
         logger.info(f"Starting policy analysis for: {collected_data.get('Destination Country', 'Unknown')}")
 
         # Use service manager (handles MCP + fallback)
-        result = await mcp_service_manager.analyze_policy(
+        async for token in mcp_service_manager.stream_policy(
             collected_data=collected_data,
             extracted_texts=extracted_texts
-        )
-
-        return result
+        ):
+            await msg.stream_token(token)
 
     except Exception as e:
         logger.error(f"Policy analysis failed: {str(e)}")
-        return f"Sorry, I encountered an error during policy analysis: {str(e)}"
+        msg.content = f"Sorry, I encountered an error during policy analysis: {str(e)}"
+
+    await msg.send()
+
+async def _run_combined_analysis(collected_data: dict, extracted_texts: list):
+    """
+    Run compensation calculation and policy analysis together via MCP Service Manager.
+    Both run concurrently on one shared health check, so the user waits for the
+    slower of the two rather than both in turn.
+    """
+    logger.info(f"Starting combined analysis for: {collected_data.get('Destination Location', 'Unknown')}")
+
+    compensation, policy = await mcp_service_manager.predict_both(
+        collected_data=collected_data,
+        extracted_texts=extracted_texts
+    )
+
+    for name, result in (("compensation calculation", compensation), ("policy analysis", policy)):
+        if isinstance(result, BaseException):
+            result = f"Sorry, I encountered an error during {name}: {str(result)}"
+        await cl.Message(content=result).send()
 
 # --- Chainlit Event Handlers ---
 
@@ -341,6 +392,12 @@ async def start_chat():
     
     print(f"Chat session started for user: {user.identifier if user else 'Unknown'}")
 
+@cl.on_app_shutdown
+async def shutdown():
+    """Stops request batching and releases pooled HTTP connections on app exit."""
+    await mcp_service_manager.aclose()
+    await client.close()
+
 @cl.on_message
 async def handle_message(msg: cl.Message):
     """Handles messages, processes files, calls LLM."""
@@ -496,11 +553,11 @@ async def handle_message(msg: cl.Message):
             if user_query.lower().strip() in ['yes', 'correct', 'looks good', 'confirmed', 'yep', 'yup', 'yeah']:
                 # All data confirmed - proceed to calculation
                 if current_route == "compensation":
-                    calc_response = await _run_compensation_calculation(collected_data, extracted_texts)
-                    await cl.Message(content=calc_response).send()
+                    await _run_compensation_calculation(collected_data, extracted_texts)
                 elif current_route == "policy":
-                    policy_response = await _run_policy_analysis(collected_data, extracted_texts)
-                    await cl.Message(content=policy_response).send()
+                    await _run_policy_analysis(collected_data, extracted_texts)
+                elif current_route == "both_policy_and_compensation":
+                    await _run_combined_analysis(collected_data, extracted_texts)
 
                 # Reset conversational mode
                 user_session["conversational_mode"] = False
@@ -564,8 +621,7 @@ async def handle_message(msg: cl.Message):
             if is_completed:
                 # Start compensation calculation
                 collected_data = input_collector.get_collected_data("compensation", updated_session)
-                calc_response = await _run_compensation_calculation(collected_data, extracted_texts)
-                await cl.Message(content=calc_response).send()
+                await _run_compensation_calculation(collected_data, extracted_texts)
             
             return
             
@@ -581,8 +637,7 @@ async def handle_message(msg: cl.Message):
             if is_completed:
                 # Start policy analysis
                 collected_data = input_collector.get_collected_data("policy", updated_session)
-                policy_response = await _run_policy_analysis(collected_data, extracted_texts)
-                await cl.Message(content=policy_response).send()
+                await _run_policy_analysis(collected_data, extracted_texts)
             
             return
         
@@ -640,7 +695,17 @@ async def handle_message(msg: cl.Message):
             user_choice = user_query.lower().strip()
             user_session["awaiting_both_choice"] = False
             
-            if "policy" in user_choice or user_choice == "1":
+            if "both" in user_choice or user_choice == "3":
+                # Collect everything once, then run both analyses together
+                user_session["conversational_mode"] = True
+                user_session["current_route"] = "both_policy_and_compensation"
+                user_session["collected_data"] = {}
+                user_session["conversation_history"] = []
+                cl.user_session.set("user_data", user_session)
+                intro = await conversational_collector.start_conversation("both_policy_and_compensation")
+                await cl.Message(content=intro).send()
+                return
+            elif "policy" in user_choice or user_choice == "1":
                 # Start policy collection
                 question, updated_session = input_collector.start_collection("policy", user_session)
                 cl.user_session.set("user_data", updated_session)
@@ -4,80 +4,305 @@ Handles health checks, fallback logic, and service coordination
 """
 
 import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import re
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple, Union
+from datetime import datetime
 import os
 import sys
 
-from openai import AsyncOpenAI
-
-# Import AGNO client from same directory
-try:
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
     from agno_mcp_client import GlobalIQAgentSystem
-except ImportError:
-    # Try relative import if running as module
-    from .agno_mcp_client import GlobalIQAgentSystem
 
 logger = logging.getLogger(__name__)
 
 
+def _load_agno():
+    """Import the AGNO client on first use so fallback-only setups never load it"""
+    try:
+        from agno_mcp_client import GlobalIQAgentSystem
+    except ImportError:
+        # Try relative import if running as module
+        from .agno_mcp_client import GlobalIQAgentSystem
+    return GlobalIQAgentSystem
+
+# Patterns used to normalize collected field values into MCP parameters
+# First number in a salary, with an optional k/m multiplier that isn't the start of a word
+_SALARY_RE = re.compile(r'(\d+(?:\.\d+)?)(?:\s*([kKmM])(?![a-zA-Z]))?')
+_CCY_CODE_RE = re.compile(r'\b(USD|GBP|EUR|JPY|CAD|AUD)\b', re.IGNORECASE)
+_FAMILY_NUM_RE = re.compile(r'\d+')
+
+# How long identical fallback prompts reuse an earlier GPT-4 answer
+FALLBACK_CACHE_TTL_SECONDS = 600
+
+# Formatted MCP results reused for identical parameters
+RESULT_CACHE_TTL_SECONDS = 300
+RESULT_CACHE_SIZE = 128
+
+# Concurrent MCP compensation calls are coalesced into batches of this size
+COMPENSATION_BATCH_SIZE = 8
+COMPENSATION_BATCH_WINDOW_SECONDS = 0.01
+
+_SALARY_MULTIPLIERS = {'': 1.0, 'k': 1e3, 'm': 1e6}
+
+_CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '£': 'GBP',
+    '€': 'EUR',
+    '¥': 'JPY'
+}
+
+
+@dataclass(slots=True)
+class CollectedSnapshot:
+    """Collected conversation fields read once per request, with MCP defaults applied"""
+
+    origin_location: str = "Unknown"
+    destination_location: str = "Unknown"
+    current_comp: str = ""
+    assignment_duration: str = "12 months"
+    job_level: str = "Manager"
+    family_size: str = "1"
+    housing_preference: str = "Company-provided"
+    origin_country: str = "Unknown"
+    destination_country: str = "Unknown"
+    assignment_type: str = "Long-term"
+    job_title: str = "Manager"
+
+    @classmethod
+    def from_dict(cls, collected_data: Dict[str, Any]) -> "CollectedSnapshot":
+        """Build a snapshot from the conversational collector's field dict"""
+        get = collected_data.get
+        return cls(
+            origin_location=get("Origin Location", "Unknown"),
+            destination_location=get("Destination Location", "Unknown"),
+            current_comp=get("Current Compensation", ""),
+            assignment_duration=get("Assignment Duration", "12 months"),
+            job_level=get("Job Level/Title", "Manager"),
+            family_size=get("Family Size", "1"),
+            housing_preference=get("Housing Preference", "Company-provided"),
+            origin_country=get("Origin Country", "Unknown"),
+            destination_country=get("Destination Country", "Unknown"),
+            assignment_type=get("Assignment Type", "Long-term"),
+            job_title=get("Job Title", "Manager")
+        )
+
+
+async def _collect(stream: AsyncIterator[str]) -> str:
+    """Join a streamed response into a single string"""
+    return "".join([chunk async for chunk in stream])
+
+
 class ServiceHealthMonitor:
     """Monitors health of MCP services with caching"""
 
     def __init__(self, cache_duration_seconds: int = 30):
-        self.cache_duration = timedelta(seconds=cache_duration_seconds)
-        self.last_check: Optional[datetime] = None
+        self.cache_duration = float(cache_duration_seconds)
+        # Monotonic time of the last probe; wall-clock copy kept for reporting
+        self.last_check: Optional[float] = None
+        self.last_check_wall: Optional[datetime] = None
         self.last_status: Dict[str, bool] = {
             "compensation_server": False,
             "policy_server": False
         }
-        self._lock = asyncio.Lock()  # Prevent race conditions
+        # Refresh currently in progress; concurrent callers await it
+        self._inflight: Optional[asyncio.Future] = None
 
     def is_cache_valid(self) -> bool:
         """Check if cached health status is still valid"""
-        if self.last_check is None:
-            return False
-        return datetime.now() - self.last_check < self.cache_duration
+        return self.last_check is not None and time.monotonic() - self.last_check < self.cache_duration
 
-    async def check_health(self, agent_system: GlobalIQAgentSystem) -> Dict[str, bool]:
+    async def check_health(self, agent_system: "GlobalIQAgentSystem") -> Dict[str, bool]:
         """
-        Check health of MCP servers with caching (thread-safe)
+        Check health of MCP servers with caching (single-flight)
+
+        When the cache is stale only one refresh runs at a time; every caller
+        that arrives meanwhile shares its result instead of probing again.
 
         Returns:
             Dict with health status of each server
         """
-        # Quick check without lock for cache hit
         if self.is_cache_valid():
             logger.debug("Using cached health status")
             return self.last_status
 
-        # Acquire lock for health check to prevent concurrent checks
-        async with self._lock:
-            # Double-check cache validity after acquiring lock
-            if self.is_cache_valid():
-                logger.debug("Using cached health status (after lock)")
-                return self.last_status
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh(agent_system))
+            self._inflight.add_done_callback(self._clear_inflight)
+        else:
+            logger.debug("Joining in-flight health check")
 
-            # Perform fresh health check
-            logger.info("Performing health check on MCP servers")
-            try:
-                health_status = await asyncio.to_thread(agent_system.health_check)
-                self.last_status = health_status
-                self.last_check = datetime.now()
+        # Shield so one cancelled caller doesn't cancel the shared refresh
+        return await asyncio.shield(self._inflight)
 
-                logger.info(f"Health check results: {health_status}")
-                return health_status
-            except Exception as e:
-                logger.error(f"Health check failed: {str(e)}")
-                # Return last known status or default to unhealthy
-                return self.last_status
+    async def _refresh(self, agent_system: "GlobalIQAgentSystem") -> Dict[str, bool]:
+        """Probe the MCP servers and update the cached status"""
+        logger.info("Performing health check on MCP servers")
+        try:
+            health_status = await agent_system.health_check()
+            self.last_status = health_status
+            # Stamp after the probe completes so the cache window starts from fresh data
+            self.last_check = time.monotonic()
+            self.last_check_wall = datetime.now()
+
+            logger.info(f"Health check results: {health_status}")
+            return health_status
+        except Exception as e:
+            logger.error(f"Health check failed: {str(e)}")
+            # Return last known status or default to unhealthy
+            return self.last_status
+
+    def _clear_inflight(self, future: asyncio.Future):
+        """Allow the next stale-cache caller to start a new refresh"""
+        if self._inflight is future:
+            self._inflight = None
 
     def invalidate_cache(self):
         """Force next health check to be fresh"""
         self.last_check = None
 
 
+class CircuitBreaker:
+    """
+    Per-server circuit breaker for MCP calls
+
+    Failures are counted over a sliding `window_seconds` window; once
+    `failure_threshold` of them fall inside it the circuit opens and calls
+    go straight to fallback. Any success clears the count. Once
+    `reset_seconds` have passed a single probe is let through; success
+    closes the circuit, another failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        window_seconds: float = 60.0,
+        reset_seconds: float = 30.0
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.reset_seconds = reset_seconds
+        self.failures: deque = deque()
+        self.opened_at: Optional[float] = None
+
+    def is_open(self) -> bool:
+        """Return True if calls should skip MCP right now"""
+        if self.opened_at is None:
+            return False
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_seconds:
+            # Half-open: let this caller probe, keep others on fallback
+            self.opened_at = now
+            return False
+        return True
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        self.failures.clear()
+        self.opened_at = None
+
+    def record_failure(self):
+        """Count a failed call and open the circuit past the threshold"""
+        now = time.monotonic()
+        self.failures.append(now)
+        while self.failures and now - self.failures[0] > self.window_seconds:
+            self.failures.popleft()
+        if len(self.failures) >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit opened for {self.name} after repeated failures")
+            self.opened_at = now
+
+
+class RequestBatcher:
+    """
+    Coalesces concurrent calls into batched dispatches
+
+    While other calls are queued or in flight, the first queued item opens a
+    window of `batch_window` seconds (or until `batch_size` items are waiting);
+    everything queued by then is sent in one `dispatch` call, which must
+    return one result per item in item order. A lone call is sent without
+    waiting, so under low load this degrades to single-item batches. Each batch is dispatched as its own
+    task so a slow batch never holds up the next window.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int = COMPENSATION_BATCH_SIZE,
+        batch_window: float = COMPENSATION_BATCH_WINDOW_SECONDS
+    ):
+        self._dispatch = dispatch
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # Created on first use so they bind to the running event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result from the next batch"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.ensure_future(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self):
+        """Collect queued items into batches until cancelled"""
+        while True:
+            batch = [await self._queue.get()]
+            # Only hold the window open when there is concurrency to coalesce;
+            # a lone call is sent straight away
+            waiting = self._queue.qsize()
+            if (waiting or self._in_flight) and waiting < self.batch_size - 1:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            task = asyncio.ensure_future(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Dispatch one batch and resolve each caller's future"""
+        try:
+            results = await self._dispatch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+        if len(results) != len(batch):
+            error = RuntimeError(
+                f"Batch dispatch returned {len(results)} results for {len(batch)} items"
+            )
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def aclose(self):
+        """Stop collecting batches and wait for in-flight dispatches"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+
 class MCPServiceManager:
     """
     Central service manager for MCP integration
@@ -86,7 +311,7 @@ class MCPServiceManager:
 
     def __init__(
         self,
-        openai_client: AsyncOpenAI,
+        openai_client: "AsyncOpenAI",
         compensation_server_url: str = "http://localhost:8081",
         policy_server_url: str = "http://localhost:8082",
         enable_mcp: bool = True
@@ -103,32 +328,59 @@ class MCPServiceManager:
         self.openai_client = openai_client
         self.enable_mcp = enable_mcp
 
-        # Initialize AGNO agent system
-        try:
-            self.agent_system = GlobalIQAgentSystem(
-                compensation_server_url=compensation_server_url,
-                policy_server_url=policy_server_url
-            )
-            logger.info("AGNO Agent System initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize AGNO Agent System: {str(e)}")
-            self.agent_system = None
-            self.enable_mcp = False
+        # Initialize AGNO agent system (only imported when MCP is enabled)
+        self.agent_system = None
+        if self.enable_mcp:
+            try:
+                self.agent_system = _load_agno()(
+                    compensation_server_url=compensation_server_url,
+                    policy_server_url=policy_server_url
+                )
+                logger.info("AGNO Agent System initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize AGNO Agent System: {str(e)}")
+                self.enable_mcp = False
+        else:
+            logger.info("MCP disabled, AGNO Agent System not loaded")
+
+        # Simultaneous compensation requests share one MCP round trip
+        self._compensation_batcher: Optional[RequestBatcher] = None
+        if self.agent_system:
+            self._compensation_batcher = RequestBatcher(self.agent_system.predict_compensation_batch)
 
         # Initialize health monitor
         self.health_monitor = ServiceHealthMonitor(cache_duration_seconds=30)
 
+        # Skip MCP servers that keep failing instead of waiting on timeouts
+        self._breakers = {
+            "compensation_server": CircuitBreaker("compensation_server"),
+            "policy_server": CircuitBreaker("policy_server")
+        }
+
+        # Fallback answers keyed by prompt hash -> (stored_at, content)
+        self._llm_cache: Dict[str, Tuple[float, str]] = {}
+        # Completion currently being fetched per prompt hash; identical callers await it
+        self._llm_inflight: Dict[str, asyncio.Task] = {}
+
+        # MCP responses keyed by (route, sorted params) -> (stored_at, response)
+        self._result_cache: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+
         # Track usage statistics
         self.stats = {
             "mcp_calls": 0,
             "fallback_calls": 0,
-            "errors": 0
+            "errors": 0,
+            "circuit_open_skips": 0,
+            "cache_hits": 0
         }
 
     async def predict_compensation(
         self,
         collected_data: Dict[str, Any],
-        extracted_texts: list = None
+        extracted_texts: list = None,
+        health: Optional[Dict[str, bool]] = None,
+        prompt_context: Optional[Tuple[str, str]] = None,
+        mcp_result: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Get compensation prediction via MCP or fallback
@@ -136,45 +388,102 @@ class MCPServiceManager:
         Args:
             collected_data: User data collected from conversation
             extracted_texts: Document context (optional)
+            health: Server health already fetched by the caller (optional)
+            prompt_context: Prebuilt fallback prompt context (optional)
+            mcp_result: MCP result already fetched by the caller (optional)
 
         Returns:
             Formatted compensation response
         """
+        return await _collect(
+            self.stream_compensation(collected_data, extracted_texts, health, prompt_context, mcp_result)
+        )
+
+    async def stream_compensation(
+        self,
+        collected_data: Dict[str, Any],
+        extracted_texts: list = None,
+        health: Optional[Dict[str, bool]] = None,
+        prompt_context: Optional[Tuple[str, str]] = None,
+        mcp_result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream compensation prediction via MCP or fallback
+
+        MCP results arrive as one formatted chunk; the GPT-4 fallback is
+        streamed token by token so the user sees output immediately.
+
+        Args:
+            collected_data: User data collected from conversation
+            extracted_texts: Document context (optional)
+            health: Server health already fetched by the caller (optional)
+            prompt_context: Prebuilt fallback prompt context (optional)
+            mcp_result: MCP result already fetched by the caller (optional)
+
+        Yields:
+            Chunks of the formatted compensation response
+        """
         # Try MCP first if enabled
         if self.enable_mcp and self.agent_system:
-            health = await self.health_monitor.check_health(self.agent_system)
-
-            if health.get("compensation_server", False):
+            # Map collected data to MCP parameters
+            mcp_params = self._map_compensation_params(CollectedSnapshot.from_dict(collected_data))
+
+            # Identical parameters reuse a recent MCP result without any network call
+            cache_key = ("compensation", tuple(sorted(mcp_params.items())))
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                yield cached
+                return
+
+            if health is None:
+                health = await self.health_monitor.check_health(self.agent_system)
+
+            breaker = self._breakers["compensation_server"]
+
+            if health.get("compensation_server", False) and breaker.is_open():
+                logger.info("MCP compensation circuit open, skipping to fallback")
+                self.stats["circuit_open_skips"] += 1
+            elif health.get("compensation_server", False):
                 try:
                     logger.info("Using MCP compensation server")
 
-                    # Map collected data to MCP parameters
-                    mcp_params = self._map_compensation_params(collected_data)
-
-                    # Call MCP via AGNO
-                    result = await self.agent_system.predict_compensation(**mcp_params)
+                    # Call MCP via AGNO, batched with any concurrent requests
+                    if mcp_result is None:
+                        mcp_result = await self._compensation_batcher.submit(mcp_params)
+                    result = mcp_result
 
                     if result.get("status") == "success":
+                        breaker.record_success()
                         self.stats["mcp_calls"] += 1
-                        return self._format_compensation_response(result, source="MCP")
+                        response = self._format_compensation_response(result, source="MCP")
+                        self._store_result(cache_key, response)
+                        yield response
+                        return
                     else:
                         logger.warning(f"MCP returned error: {result.get('error')}")
+                        breaker.record_failure()
                         # Fall through to fallback
 
                 except Exception as e:
                     logger.error(f"MCP compensation call failed: {str(e)}")
+                    breaker.record_failure()
                     self.stats["errors"] += 1
                     # Fall through to fallback
 
         # Fallback to direct GPT-4
         logger.info("Using fallback GPT-4 for compensation")
         self.stats["fallback_calls"] += 1
-        return await self._fallback_compensation(collected_data, extracted_texts)
+        async for chunk in self._fallback_compensation(collected_data, extracted_texts, prompt_context):
+            yield chunk
 
     async def analyze_policy(
         self,
         collected_data: Dict[str, Any],
-        extracted_texts: list = None
+        extracted_texts: list = None,
+        health: Optional[Dict[str, bool]] = None,
+        prompt_context: Optional[Tuple[str, str]] = None,
+        mcp_result: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Get policy analysis via MCP or fallback
@@ -182,97 +491,234 @@ class MCPServiceManager:
         Args:
             collected_data: User data collected from conversation
             extracted_texts: Document context (optional)
+            health: Server health already fetched by the caller (optional)
+            prompt_context: Prebuilt fallback prompt context (optional)
+            mcp_result: MCP result already fetched by the caller (optional)
 
         Returns:
             Formatted policy response
         """
+        return await _collect(
+            self.stream_policy(collected_data, extracted_texts, health, prompt_context, mcp_result)
+        )
+
+    async def stream_policy(
+        self,
+        collected_data: Dict[str, Any],
+        extracted_texts: list = None,
+        health: Optional[Dict[str, bool]] = None,
+        prompt_context: Optional[Tuple[str, str]] = None,
+        mcp_result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream policy analysis via MCP or fallback
+
+        MCP results arrive as one formatted chunk; the GPT-4 fallback is
+        streamed token by token so the user sees output immediately.
+
+        Args:
+            collected_data: User data collected from conversation
+            extracted_texts: Document context (optional)
+            health: Server health already fetched by the caller (optional)
+            prompt_context: Prebuilt fallback prompt context (optional)
+            mcp_result: MCP result already fetched by the caller (optional)
+
+        Yields:
+            Chunks of the formatted policy response
+        """
         # Try MCP first if enabled
         if self.enable_mcp and self.agent_system:
-            health = await self.health_monitor.check_health(self.agent_system)
-
-            if health.get("policy_server", False):
+            # Map collected data to MCP parameters
+            mcp_params = self._map_policy_params(CollectedSnapshot.from_dict(collected_data))
+
+            # Identical parameters reuse a recent MCP result without any network call
+            cache_key = ("policy", tuple(sorted(mcp_params.items())))
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                yield cached
+                return
+
+            if health is None:
+                health = await self.health_monitor.check_health(self.agent_system)
+
+            breaker = self._breakers["policy_server"]
+
+            if health.get("policy_server", False) and breaker.is_open():
+                logger.info("MCP policy circuit open, skipping to fallback")
+                self.stats["circuit_open_skips"] += 1
+            elif health.get("policy_server", False):
                 try:
                     logger.info("Using MCP policy server")
 
-                    # Map collected data to MCP parameters
-                    mcp_params = self._map_policy_params(collected_data)
-
                     # Call MCP via AGNO
-                    result = await self.agent_system.analyze_policy(**mcp_params)
+                    if mcp_result is None:
+                        mcp_result = await self.agent_system.analyze_policy(**mcp_params)
+                    result = mcp_result
 
                     if result.get("status") == "success":
+                        breaker.record_success()
                         self.stats["mcp_calls"] += 1
-                        return self._format_policy_response(result, source="MCP")
+                        response = self._format_policy_response(result, source="MCP")
+                        self._store_result(cache_key, response)
+                        yield response
+                        return
                     else:
                         logger.warning(f"MCP returned error: {result.get('error')}")
+                        breaker.record_failure()
                         # Fall through to fallback
 
                 except Exception as e:
                     logger.error(f"MCP policy call failed: {str(e)}")
+                    breaker.record_failure()
                     self.stats["errors"] += 1
                     # Fall through to fallback
 
         # Fallback to direct GPT-4
         logger.info("Using fallback GPT-4 for policy")
         self.stats["fallback_calls"] += 1
-        return await self._fallback_policy(collected_data, extracted_texts)
+        async for chunk in self._fallback_policy(collected_data, extracted_texts, prompt_context):
+            yield chunk
+
+    async def predict_both(
+        self,
+        collected_data: Dict[str, Any],
+        extracted_texts: list = None
+    ) -> Tuple[Union[str, BaseException], Union[str, BaseException]]:
+        """
+        Run compensation and policy analysis concurrently
+
+        Health is checked once up front and shared by both branches, and the
+        two MCP/GPT-4 calls overlap so the reply takes as long as the slower
+        one rather than the sum of both. When both MCP calls are due they go
+        out together through the AGNO client's predict_both.
 
-    def _map_compensation_params(self, collected_data: Dict) -> Dict:
+        Args:
+            collected_data: User data collected from conversation
+            extracted_texts: Document context (optional)
+
+        Returns:
+            (compensation_response, policy_response); a branch that raised
+            is returned as its exception so the other result is not lost
+        """
+        health = None
+        compensation_result = policy_result = None
+        if self.enable_mcp and self.agent_system:
+            health = await self.health_monitor.check_health(self.agent_system)
+            compensation_result, policy_result = await self._fetch_both_from_mcp(collected_data, health)
+
+        # Both fallback prompts share the same data summary and document context
+        prompt_context = self._build_prompt_context(collected_data, extracted_texts)
+
+        compensation, policy = await asyncio.gather(
+            self.predict_compensation(
+                collected_data, extracted_texts, health=health,
+                prompt_context=prompt_context, mcp_result=compensation_result
+            ),
+            self.analyze_policy(
+                collected_data, extracted_texts, health=health,
+                prompt_context=prompt_context, mcp_result=policy_result
+            ),
+            return_exceptions=True
+        )
+
+        for name, result in (("compensation", compensation), ("policy", policy)):
+            if isinstance(result, BaseException):
+                logger.error(f"Combined {name} analysis failed: {str(result)}")
+                self.stats["errors"] += 1
+
+        return compensation, policy
+
+    async def _fetch_both_from_mcp(
+        self,
+        collected_data: Dict[str, Any],
+        health: Dict[str, bool]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Fetch both MCP results with one concurrent AGNO call when both are due
+
+        Only used when both servers are healthy, neither circuit is open or
+        probing, and neither answer is cached; otherwise (None, None) is
+        returned and each branch makes its own call as usual.
+        """
+        servers = ("compensation_server", "policy_server")
+        if not all(health.get(s, False) and self._breakers[s].opened_at is None for s in servers):
+            return None, None
+
+        snapshot = CollectedSnapshot.from_dict(collected_data)
+        compensation_params = self._map_compensation_params(snapshot)
+        policy_params = self._map_policy_params(snapshot)
+        if (
+            self._get_cached_result(("compensation", tuple(sorted(compensation_params.items())))) is not None
+            or self._get_cached_result(("policy", tuple(sorted(policy_params.items())))) is not None
+        ):
+            return None, None
+
+        logger.info("Using MCP compensation and policy servers together")
+        return await self.agent_system.predict_both(compensation_params, policy_params)
+
+    def _get_cached_result(self, key: Tuple) -> Optional[str]:
+        """Return a cached MCP response if it has not expired"""
+        entry = self._result_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if time.monotonic() - stored_at >= RESULT_CACHE_TTL_SECONDS:
+            del self._result_cache[key]
+            return None
+        self._result_cache.move_to_end(key)
+        logger.debug("Using cached MCP response")
+        return response
+
+    def _store_result(self, key: Tuple, response: str):
+        """Cache an MCP response, evicting the least recently used entry when full"""
+        self._result_cache[key] = (time.monotonic(), response)
+        self._result_cache.move_to_end(key)
+        if len(self._result_cache) > RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
+    def _map_compensation_params(self, snapshot: CollectedSnapshot) -> Dict:
         """Map collected conversational data to MCP API parameters"""
         return {
-            "origin_location": collected_data.get("Origin Location", "Unknown"),
-            "destination_location": collected_data.get("Destination Location", "Unknown"),
-            "current_salary": self._parse_salary(collected_data.get("Current Compensation", "0")),
-            "currency": self._extract_currency(collected_data.get("Current Compensation", "USD")),
-            "assignment_duration": collected_data.get("Assignment Duration", "12 months"),
-            "job_level": collected_data.get("Job Level/Title", "Manager"),
-            "family_size": self._parse_family_size(collected_data.get("Family Size", "1")),
-            "housing_preference": collected_data.get("Housing Preference", "Company-provided")
+            "origin_location": snapshot.origin_location,
+            "destination_location": snapshot.destination_location,
+            "current_salary": self._parse_salary(snapshot.current_comp),
+            "currency": self._extract_currency(snapshot.current_comp),
+            "assignment_duration": snapshot.assignment_duration,
+            "job_level": snapshot.job_level,
+            "family_size": self._parse_family_size(snapshot.family_size),
+            "housing_preference": snapshot.housing_preference
         }
 
-    def _map_policy_params(self, collected_data: Dict) -> Dict:
+    def _map_policy_params(self, snapshot: CollectedSnapshot) -> Dict:
         """Map collected conversational data to MCP API parameters"""
         return {
-            "origin_country": collected_data.get("Origin Country", "Unknown"),
-            "destination_country": collected_data.get("Destination Country", "Unknown"),
-            "assignment_type": collected_data.get("Assignment Type", "Long-term"),
-            "duration": collected_data.get("Assignment Duration", "12 months"),
-            "job_title": collected_data.get("Job Title", "Manager")
+            "origin_country": snapshot.origin_country,
+            "destination_country": snapshot.destination_country,
+            "assignment_type": snapshot.assignment_type,
+            "duration": snapshot.assignment_duration,
+            "job_title": snapshot.job_title
         }
 
     def _parse_salary(self, salary_str: str) -> float:
-        """Extract numeric salary from string like '$100,000' or '100k'"""
-        import re
-
-        # Remove currency symbols and commas
-        clean = re.sub(r'[,$£€¥]', '', str(salary_str))
-
-        # Handle 'k' suffix (thousands)
-        if 'k' in clean.lower():
-            clean = clean.lower().replace('k', '000')
-
-        # Extract number
-        try:
-            return float(re.sub(r'[^\d.]', '', clean))
-        except:
+        """Extract numeric salary from string like '$100,000', '100k' or '2.5m'"""
+        match = _SALARY_RE.search(str(salary_str).replace(',', ''))
+        if not match:
             return 0.0
+        return float(match.group(1)) * _SALARY_MULTIPLIERS[(match.group(2) or '').lower()]
 
     def _extract_currency(self, salary_str: str) -> str:
         """Extract currency code from salary string"""
-        currency_symbols = {
-            '$': 'USD',
-            '£': 'GBP',
-            '€': 'EUR',
-            '¥': 'JPY'
-        }
+        salary_str = str(salary_str)
 
-        for symbol, code in currency_symbols.items():
-            if symbol in str(salary_str):
+        # Single pass over the string; the first currency symbol wins
+        for ch in salary_str:
+            code = _CURRENCY_SYMBOLS.get(ch)
+            if code:
                 return code
 
         # Check for currency codes in text
-        import re
-        match = re.search(r'\b(USD|GBP|EUR|JPY|CAD|AUD)\b', str(salary_str), re.IGNORECASE)
+        match = _CCY_CODE_RE.search(salary_str)
         if match:
             return match.group(1).upper()
 
@@ -280,10 +726,9 @@ class MCPServiceManager:
 
     def _parse_family_size(self, family_str: str) -> int:
         """Extract numeric family size"""
-        import re
         try:
             # Extract first number found
-            match = re.search(r'\d+', str(family_str))
+            match = _FAMILY_NUM_RE.search(str(family_str))
             if match:
                 return int(match.group())
             return 1
@@ -297,35 +742,40 @@ class MCPServiceManager:
         recommendations = mcp_result.get("recommendations", [])
         confidence = mcp_result.get("confidence_scores", {})
 
-        response = f"💰 **Compensation Calculation Results** (via {source})\n\n"
-
-        # Main package summary
-        response += "### 📊 Total Package\n"
-        response += f"**{predictions.get('total_package', 0):,.2f} {predictions.get('currency', 'USD')}**\n\n"
-
-        # Breakdown
-        response += "### 📋 Breakdown\n"
-        response += f"• Base Salary: {predictions.get('base_salary', 0):,.2f} {predictions.get('currency', 'USD')}\n"
-        response += f"• COLA Adjustment ({predictions.get('cola_ratio', 1.0):.2f}x): {breakdown.get('cola_adjustment', 0):,.2f} {predictions.get('currency', 'USD')}\n"
-        response += f"• Housing Allowance: {breakdown.get('housing', 0):,.2f} {predictions.get('currency', 'USD')}\n"
-        if breakdown.get('hardship', 0) > 0:
-            response += f"• Hardship Pay: {breakdown.get('hardship', 0):,.2f} {predictions.get('currency', 'USD')}\n"
-        response += "\n"
+        ccy = predictions.get('currency', 'USD')
+
+        parts = [
+            f"💰 **Compensation Calculation Results** (via {source})\n\n",
+            # Main package summary
+            "### 📊 Total Package\n",
+            f"**{predictions.get('total_package', 0):,.2f} {ccy}**\n\n",
+            # Breakdown
+            "### 📋 Breakdown\n",
+            f"• Base Salary: {predictions.get('base_salary', 0):,.2f} {ccy}\n",
+            f"• COLA Adjustment ({predictions.get('cola_ratio', 1.0):.2f}x): {breakdown.get('cola_adjustment', 0):,.2f} {ccy}\n",
+            f"• Housing Allowance: {breakdown.get('housing', 0):,.2f} {ccy}\n",
+        ]
+        hardship = breakdown.get('hardship', 0)
+        if hardship > 0:
+            parts.append(f"• Hardship Pay: {hardship:,.2f} {ccy}\n")
+        parts.append("\n")
 
         # Confidence scores
         if confidence:
-            response += "### 🎯 Confidence Scores\n"
-            response += f"• Overall: {confidence.get('overall', 0.5):.0%}\n"
-            response += f"• COLA: {confidence.get('cola', 0.5):.0%}\n"
-            response += f"• Housing: {confidence.get('housing', 0.5):.0%}\n\n"
+            parts.extend((
+                "### 🎯 Confidence Scores\n",
+                f"• Overall: {confidence.get('overall', 0.5):.0%}\n",
+                f"• COLA: {confidence.get('cola', 0.5):.0%}\n",
+                f"• Housing: {confidence.get('housing', 0.5):.0%}\n\n",
+            ))
 
         # Recommendations
         if recommendations:
-            response += "### 💡 Recommendations\n"
+            parts.append("### 💡 Recommendations\n")
             for i, rec in enumerate(recommendations, 1):
-                response += f"{i}. {rec}\n"
+                parts.append(f"{i}. {rec}\n")
 
-        return response
+        return "".join(parts)
 
     def _format_policy_response(self, mcp_result: Dict, source: str) -> str:
         """Format MCP policy result for Chainlit display"""
@@ -333,80 +783,101 @@ class MCPServiceManager:
         recommendations = mcp_result.get("recommendations", [])
         confidence = mcp_result.get("confidence", 0.85)
 
-        response = f"📋 **Policy Analysis Results** (via {source})\n\n"
+        parts = [f"📋 **Policy Analysis Results** (via {source})\n\n"]
 
         # Visa requirements
         visa = analysis.get("visa_requirements", {})
         if visa:
-            response += "### 🛂 Visa Requirements\n"
-            response += f"• **Type**: {visa.get('visa_type', 'TBD')}\n"
-            response += f"• **Processing Time**: {visa.get('processing_time', 'Unknown')}\n"
-            response += f"• **Cost**: {visa.get('cost', 'TBD')}\n"
-            response += "• **Requirements**:\n"
+            parts.extend((
+                "### 🛂 Visa Requirements\n",
+                f"• **Type**: {visa.get('visa_type', 'TBD')}\n",
+                f"• **Processing Time**: {visa.get('processing_time', 'Unknown')}\n",
+                f"• **Cost**: {visa.get('cost', 'TBD')}\n",
+                "• **Requirements**:\n",
+            ))
             for req in visa.get('requirements', []):
-                response += f"  - {req}\n"
-            response += "\n"
+                parts.append(f"  - {req}\n")
+            parts.append("\n")
 
         # Eligibility
         eligibility = analysis.get("eligibility", {})
         if eligibility:
-            response += "### ✅ Eligibility\n"
             meets = eligibility.get('meets_requirements', True)
-            response += f"**Status**: {'✓ Meets Requirements' if meets else '⚠ Concerns Identified'}\n"
+            parts.extend((
+                "### ✅ Eligibility\n",
+                f"**Status**: {'✓ Meets Requirements' if meets else '⚠ Concerns Identified'}\n",
+            ))
 
             concerns = eligibility.get('concerns', [])
             if concerns:
-                response += "**Concerns**:\n"
+                parts.append("**Concerns**:\n")
                 for concern in concerns:
-                    response += f"• {concern}\n"
-            response += "\n"
+                    parts.append(f"• {concern}\n")
+            parts.append("\n")
 
         # Timeline
         timeline = analysis.get("timeline", {})
         if timeline:
-            response += "### 📅 Timeline\n"
+            parts.append("### 📅 Timeline\n")
             for phase, desc in timeline.items():
-                response += f"• **{phase.replace('_', ' ').title()}**: {desc}\n"
-            response += "\n"
+                parts.append(f"• **{phase.replace('_', ' ').title()}**: {desc}\n")
+            parts.append("\n")
 
         # Documentation
         docs = analysis.get("documentation", [])
         if docs:
-            response += "### 📄 Required Documents\n"
+            parts.append("### 📄 Required Documents\n")
             for doc in docs:
-                response += f"• {doc}\n"
-            response += "\n"
+                parts.append(f"• {doc}\n")
+            parts.append("\n")
 
         # Recommendations
         if recommendations:
-            response += "### 💡 Recommendations\n"
+            parts.append("### 💡 Recommendations\n")
             for i, rec in enumerate(recommendations, 1):
-                response += f"{i}. {rec}\n"
-            response += "\n"
+                parts.append(f"{i}. {rec}\n")
+            parts.append("\n")
 
         # Confidence
-        response += f"**Confidence**: {confidence:.0%}\n"
+        parts.append(f"**Confidence**: {confidence:.0%}\n")
 
-        return response
+        return "".join(parts)
 
-    async def _fallback_compensation(
+    def _build_prompt_context(
         self,
         collected_data: Dict,
         extracted_texts: list
-    ) -> str:
-        """Fallback to direct GPT-4 for compensation (original implementation)"""
-        # This is the original implementation from main.py
+    ) -> Tuple[str, str]:
+        """
+        Build the (data_summary, context_info) sections of the fallback prompts
+
+        Returns:
+            Bulleted collected data and truncated document excerpts
+        """
         data_summary = "\n".join([f"• **{key}:** {value}" for key, value in collected_data.items()])
 
         context_info = ""
         if extracted_texts:
-            context_info = "\n\nAdditional context from uploaded documents:\n"
-            for item in extracted_texts:
-                max_len = 1000
-                truncated_content = item['content'][:max_len]
-                if len(item['content']) > max_len:
-                    truncated_content += "..."
-                context_info += f"\n--- {item['name']} ---\n{truncated_content}\n"
+            max_len = 1000
+            context_info = "\n\nAdditional context from uploaded documents:\n" + "".join(
+                f"\n--- {item['name']} ---\n"
+                f"{item['content'][:max_len]}{'...' if len(item['content']) > max_len else ''}\n"
+                for item in extracted_texts
+            )
+
+        return data_summary, context_info
+
+    async def _fallback_compensation(
+        self,
+        collected_data: Dict,
+        extracted_texts: list,
+        prompt_context: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Fallback to direct GPT-4 for compensation, streamed (original implementation)"""
+        # This is the original implementation from main.py
+        data_summary, context_info = prompt_context or self._build_prompt_context(
+            collected_data, extracted_texts
+        )
 
         calc_prompt = f"""You are the Global IQ Compensation Calculator AI engine with years of mobility data and cost analysis experience.
 
@@ -425,32 +896,21 @@ Provide a detailed breakdown including:
 
 Format your response professionally with clear financial breakdowns."""
 
-        response = await self.openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": calc_prompt}],
-            temperature=0.3
-        )
-
-        return f"💰 **Compensation Calculation Results** (via Fallback GPT-4)\n\n{response.choices[0].message.content}"
+        yield "💰 **Compensation Calculation Results** (via Fallback GPT-4)\n\n"
+        async for chunk in self._cached_completion(calc_prompt):
+            yield chunk
 
     async def _fallback_policy(
         self,
         collected_data: Dict,
-        extracted_texts: list
-    ) -> str:
-        """Fallback to direct GPT-4 for policy (original implementation)"""
+        extracted_texts: list,
+        prompt_context: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Fallback to direct GPT-4 for policy, streamed (original implementation)"""
         # This is the original implementation from main.py
-        data_summary = "\n".join([f"• **{key}:** {value}" for key, value in collected_data.items()])
-
-        context_info = ""
-        if extracted_texts:
-            context_info = "\n\nAdditional context from uploaded documents:\n"
-            for item in extracted_texts:
-                max_len = 1000
-                truncated_content = item['content'][:max_len]
-                if len(item['content']) > max_len:
-                    truncated_content += "..."
-                context_info += f"\n--- {item['name']} ---\n{truncated_content}\n"
+        data_summary, context_info = prompt_context or self._build_prompt_context(
+            collected_data, extracted_texts
+        )
 
         policy_prompt = f"""You are the Global IQ Policy Analyzer AI engine trained on corporate mobility policies and compliance requirements.
 
@@ -469,13 +929,113 @@ Analyze and provide guidance on:
 
 Format your response as a structured policy guidance document."""
 
-        response = await self.openai_client.chat.completions.create(
+        yield "📋 **Policy Analysis Results** (via Fallback GPT-4)\n\n"
+        async for chunk in self._cached_completion(policy_prompt):
+            yield chunk
+
+    async def _cached_completion(
+        self,
+        prompt: str,
+        temperature: float = 0.3
+    ) -> AsyncIterator[str]:
+        """
+        Stream a GPT-4 completion, replaying a recent answer for an identical prompt
+
+        Only low-temperature calls are cached. A miss starts one fetch task per
+        prompt (single-flight): the caller that started it streams the chunks
+        as they arrive, while concurrent identical requests await the finished
+        answer instead of each calling the API. The task stores the answer
+        itself, so a caller that stops reading early holds nothing up. Expired
+        entries are dropped lazily, on lookup or when a new answer is stored,
+        so no background sweep is needed.
+        """
+        if temperature > 0.3:
+            async for chunk in self._stream_completion(prompt, temperature):
+                yield chunk
+            return
+
+        key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+        content = self._get_cached_llm(key)
+        if content is not None:
+            yield content
+            return
+
+        inflight = self._llm_inflight.get(key)
+        if inflight is not None:
+            logger.debug("Joining in-flight fallback completion")
+            # Shield so one cancelled caller doesn't cancel the shared fetch
+            yield await asyncio.shield(inflight)
+            return
+
+        chunks: asyncio.Queue = asyncio.Queue()
+        inflight = asyncio.ensure_future(self._fetch_completion(key, prompt, temperature, chunks))
+        self._llm_inflight[key] = inflight
+
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+        # Re-raise a failed fetch for the caller that started it
+        await asyncio.shield(inflight)
+
+    async def _fetch_completion(
+        self,
+        key: str,
+        prompt: str,
+        temperature: float,
+        chunks: asyncio.Queue
+    ) -> str:
+        """Stream a completion into chunks, then cache and return the full answer"""
+        parts = []
+        try:
+            async for chunk in self._stream_completion(prompt, temperature):
+                parts.append(chunk)
+                chunks.put_nowait(chunk)
+        finally:
+            # End of stream marker, also sent when the completion fails
+            chunks.put_nowait(None)
+            # Only the task registered for this prompt may clear the entry
+            if self._llm_inflight.get(key) is asyncio.current_task():
+                del self._llm_inflight[key]
+
+        now = time.monotonic()
+        # Misses already pay for an API call, so sweep expired entries here
+        self._llm_cache = {
+            k: v for k, v in self._llm_cache.items()
+            if now - v[0] < FALLBACK_CACHE_TTL_SECONDS
+        }
+        content = "".join(parts)
+        self._llm_cache[key] = (now, content)
+        return content
+
+    def _get_cached_llm(self, key: str) -> Optional[str]:
+        """Return a cached fallback answer if it has not expired"""
+        entry = self._llm_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, content = entry
+        if time.monotonic() - stored_at >= FALLBACK_CACHE_TTL_SECONDS:
+            del self._llm_cache[key]
+            return None
+        logger.debug("Using cached fallback response")
+        return content
+
+    async def _stream_completion(self, prompt: str, temperature: float) -> AsyncIterator[str]:
+        """Send a single-message prompt to GPT-4o and yield the reply as it streams"""
+        stream = await self.openai_client.chat.completions.create(
             model="gpt-4o",
-            messages=[{"role": "user", "content": policy_prompt}],
-            temperature=0.3
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            stream=True
         )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
-        return f"📋 **Policy Analysis Results** (via Fallback GPT-4)\n\n{response.choices[0].message.content}"
+    async def aclose(self):
+        """Stop request batching and release the AGNO client's pooled HTTP connections"""
+        if self._compensation_batcher:
+            await self._compensation_batcher.aclose()
+        if self.agent_system:
+            await self.agent_system.aclose()
 
     def get_statistics(self) -> Dict[str, int]:
         """Get usage statistics"""
@@ -495,5 +1055,5 @@ Format your response as a structured policy guidance document."""
             "mcp_enabled": self.enable_mcp,
             "servers": health,
             "statistics": self.get_statistics(),
-            "last_check": self.health_monitor.last_check.isoformat() if self.health_monitor.last_check else None
+            "last_check": self.health_monitor.last_check_wall.isoformat() if self.health_monitor.last_check_wall else None
         }
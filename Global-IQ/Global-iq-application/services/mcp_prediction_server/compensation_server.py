@@ -161,6 +161,42 @@ async def predict_compensation_endpoint(
     )
 
 
+@app.post("/predict/batch")
+async def predict_compensation_batch_endpoint(
+    requests: list[CompensationRequest]
+) -> list[Dict[str, Any]]:
+    """
+    **Batch API endpoint for compensation prediction**
+
+    Accepts a list of prediction requests and runs them concurrently.
+    Results are returned in request order; each entry has the same shape
+    as a `/predict` response, or an error object if that item failed.
+    """
+    results = await asyncio.gather(*(
+        predict_compensation(
+            origin_location=request.origin_location,
+            destination_location=request.destination_location,
+            current_salary=request.current_salary,
+            currency=request.currency,
+            assignment_duration=request.assignment_duration,
+            job_level=request.job_level,
+            family_size=request.family_size,
+            housing_preference=request.housing_preference
+        )
+        for request in requests
+    ), return_exceptions=True)
+
+    # One failed item must not fail the rest of the batch
+    return [
+        {
+            "status": "error",
+            "error": str(result),
+            "message": "Failed to generate compensation prediction"
+        } if isinstance(result, Exception) else result
+        for result in results
+    ]
+
+
 async def predict_compensation(
     origin_location: str,
     destination_location: str,
@@ -5,10 +5,12 @@ Tests that both compensation and policy servers work independently
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import sys
 import time
-from typing import Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional
 
 # Colors for output
 GREEN = '\033[92m'
@@ -20,6 +22,34 @@ RESET = '\033[0m'
 COMPENSATION_URL = "http://localhost:8081"
 POLICY_URL = "http://localhost:8082"
 
+# Shared session so repeated calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+COMPENSATION_REQUEST = {
+    "origin_location": "New York, USA",
+    "destination_location": "London, UK",
+    "current_salary": 100000.00,
+    "currency": "USD",
+    "assignment_duration": "24 months",
+    "job_level": "Senior Engineer",
+    "family_size": 3,
+    "housing_preference": "Company-provided"
+}
+
+POLICY_REQUEST = {
+    "origin_country": "United States",
+    "destination_country": "United Kingdom",
+    "assignment_type": "Long-term",
+    "duration": "24 months",
+    "job_title": "Senior Software Engineer"
+}
+
+# Request bodies serialized once rather than by requests on every call
+JSON_HEADERS = {"Content-Type": "application/json"}
+COMPENSATION_BODY = json.dumps(COMPENSATION_REQUEST, separators=(",", ":")).encode()
+POLICY_BODY = json.dumps(POLICY_REQUEST, separators=(",", ":")).encode()
+
 
 def print_header(text: str):
     """Print a section header"""
@@ -43,10 +73,15 @@ def print_warning(text: str):
     print(f"{YELLOW}⚠ {text}{RESET}")
 
 
-def test_health_check(service_name: str, url: str) -> bool:
-    """Test health check endpoint"""
+def get_health(url: str) -> requests.Response:
+    """Send a health check request"""
+    return SESSION.get(f"{url}/health", timeout=5)
+
+
+def test_health_check(service_name: str, url: str, pending: Optional[Future] = None) -> bool:
+    """Test health check endpoint (optionally using an already-sent request)"""
     try:
-        response = requests.get(f"{url}/health", timeout=5)
+        response = pending.result() if pending else get_health(url)
         if response.status_code == 200:
             data = response.json()
             print_success(f"{service_name} health check: {data}")
@@ -59,32 +94,35 @@ def test_health_check(service_name: str, url: str) -> bool:
         return False
 
 
-def test_compensation_predict() -> bool:
-    """Test compensation prediction endpoint"""
-    print_header("Testing Compensation Server (/predict)")
+def post_compensation_predict() -> requests.Response:
+    """Send the compensation prediction request"""
+    return SESSION.post(
+        f"{COMPENSATION_URL}/predict",
+        data=COMPENSATION_BODY,
+        headers=JSON_HEADERS,
+        timeout=10
+    )
+
+
+def post_policy_analyze() -> requests.Response:
+    """Send the policy analysis request"""
+    return SESSION.post(
+        f"{POLICY_URL}/analyze",
+        data=POLICY_BODY,
+        headers=JSON_HEADERS,
+        timeout=10
+    )
 
-    # Test data
-    test_request = {
-        "origin_location": "New York, USA",
-        "destination_location": "London, UK",
-        "current_salary": 100000.00,
-        "currency": "USD",
-        "assignment_duration": "24 months",
-        "job_level": "Senior Engineer",
-        "family_size": 3,
-        "housing_preference": "Company-provided"
-    }
+
+def test_compensation_predict(pending: Optional[Future] = None) -> bool:
+    """Test compensation prediction endpoint (optionally using an already-sent request)"""
+    print_header("Testing Compensation Server (/predict)")
 
     print(f"Request payload:")
-    print(json.dumps(test_request, indent=2))
+    print(json.dumps(COMPENSATION_REQUEST, indent=2))
 
     try:
-        response = requests.post(
-            f"{COMPENSATION_URL}/predict",
-            json=test_request,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
+        response = pending.result() if pending else post_compensation_predict()
 
         if response.status_code == 200:
             data = response.json()
@@ -111,29 +149,15 @@ def test_compensation_predict() -> bool:
         return False
 
 
-def test_policy_analyze() -> bool:
-    """Test policy analysis endpoint"""
+def test_policy_analyze(pending: Optional[Future] = None) -> bool:
+    """Test policy analysis endpoint (optionally using an already-sent request)"""
     print_header("Testing Policy Server (/analyze)")
 
-    # Test data
-    test_request = {
-        "origin_country": "United States",
-        "destination_country": "United Kingdom",
-        "assignment_type": "Long-term",
-        "duration": "24 months",
-        "job_title": "Senior Software Engineer"
-    }
-
     print(f"Request payload:")
-    print(json.dumps(test_request, indent=2))
+    print(json.dumps(POLICY_REQUEST, indent=2))
 
     try:
-        response = requests.post(
-            f"{POLICY_URL}/analyze",
-            json=test_request,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
+        response = pending.result() if pending else post_policy_analyze()
 
         if response.status_code == 200:
             data = response.json()
@@ -187,26 +211,34 @@ def main():
 
     results = []
 
-    # Test 1: Health checks
-    print_header("Step 1: Health Checks")
-    comp_health = test_health_check("Compensation Server", COMPENSATION_URL)
-    results.append(("Compensation Health", comp_health))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # Test 1: Health checks (both servers probed at once)
+        print_header("Step 1: Health Checks")
+        comp_health_pending = pool.submit(get_health, COMPENSATION_URL)
+        policy_health_pending = pool.submit(get_health, POLICY_URL)
 
-    policy_health = test_health_check("Policy Server", POLICY_URL)
-    results.append(("Policy Health", policy_health))
+        comp_health = test_health_check("Compensation Server", COMPENSATION_URL, comp_health_pending)
+        results.append(("Compensation Health", comp_health))
 
-    if not comp_health or not policy_health:
-        print_error("\n❌ Servers not running! Start with: docker-compose up -d")
-        print_error("Wait 30 seconds, then run this script again.")
-        return 1
+        policy_health = test_health_check("Policy Server", POLICY_URL, policy_health_pending)
+        results.append(("Policy Health", policy_health))
+
+        if not comp_health or not policy_health:
+            print_error("\n❌ Servers not running! Start with: docker-compose up -d")
+            print_error("Wait 30 seconds, then run this script again.")
+            return 1
+
+        # Send both prediction requests up front; results are reported in order
+        comp_pending = pool.submit(post_compensation_predict)
+        policy_pending = pool.submit(post_policy_analyze)
 
-    # Test 2: Compensation prediction
-    comp_predict = test_compensation_predict()
-    results.append(("Compensation Prediction", comp_predict))
+        # Test 2: Compensation prediction
+        comp_predict = test_compensation_predict(comp_pending)
+        results.append(("Compensation Prediction", comp_predict))
 
-    # Test 3: Policy analysis
-    policy_analyze = test_policy_analyze()
-    results.append(("Policy Analysis", policy_analyze))
+        # Test 3: Policy analysis
+        policy_analyze = test_policy_analyze(policy_pending)
+        results.append(("Policy Analysis", policy_analyze))
 
     # Test 4: Independence
     independence = test_independence()
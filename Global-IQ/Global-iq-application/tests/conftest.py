@@ -8,79 +8,146 @@ import pytest
 import os
 import sys
 import json
-import tempfile
 import hashlib
+import re
+from contextlib import contextmanager
+from types import MappingProxyType, SimpleNamespace
 from unittest.mock import Mock, AsyncMock, MagicMock, patch
 from typing import Dict, List
 
-# Add app directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
-
-# Mock chainlit before importing app modules
-sys.modules['chainlit'] = MagicMock()
-sys.modules['chainlit.data'] = MagicMock()
-sys.modules['chainlit.data.sql_alchemy'] = MagicMock()
+# Mock chainlit before importing app modules; the submodules are the
+# mock's own attributes so `chainlit.data` resolves the same either way
+_chainlit = MagicMock()
+sys.modules.update({
+    'chainlit': _chainlit,
+    'chainlit.data': _chainlit.data,
+    'chainlit.data.sql_alchemy': _chainlit.data.sql_alchemy,
+})
+
+# Let decorated callbacks and cl.User behave like the real thing so
+# auth_callback and the chat handlers can be exercised directly
+_chainlit.password_auth_callback = lambda func: func
+_chainlit.on_chat_start = lambda func: func
+_chainlit.on_message = lambda func: func
+_chainlit.on_app_shutdown = lambda func: func
+_chainlit.User = SimpleNamespace
+
+# main builds its OpenAI client at import time. Import it once here with a
+# placeholder key (kept only for the import) so test modules that import
+# main still collect when OPENAI_API_KEY is not set
+with patch.dict(os.environ, {'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY', 'test-api-key')}):
+    import main  # noqa: F401
+
+# Sample users as (username, password, role, name, email)
+_USERS = [
+    ("admin", "admin123", "admin", "Administrator", "admin@globaliq.com"),
+    ("hr_manager", "hr2024", "hr_manager", "HR Manager", "hr@globaliq.com"),
+    ("employee", "employee123", "employee", "Employee User", "employee@globaliq.com"),
+]
+
+# Users database built once per test run; read-only so it can be shared
+# across tests without defensive copies
+_SAMPLE_USERS_DB = MappingProxyType({
+    username: MappingProxyType({
+        "password_hash": hashlib.sha256(password.encode()).hexdigest(),
+        "role": role,
+        "name": name,
+        "email": email
+    })
+    for username, password, role, name, email in _USERS
+})
+
+
+# Sample collector data shared by every test; read-only, so tests that need
+# to change it work on a dict() copy
+_SAMPLE_COMPENSATION_DATA = MappingProxyType({
+    "Origin Location": "Chicago, USA",
+    "Destination Location": "London, UK",
+    "Current Compensation": "100,000 USD",
+    "Assignment Duration": "2 years",
+    "Job Level/Title": "Senior Engineer",
+    "Family Size": "2",
+    "Housing Preference": "Apartment"
+})
+
+_SAMPLE_POLICY_DATA = MappingProxyType({
+    "Origin Country": "United States",
+    "Destination Country": "United Kingdom",
+    "Assignment Type": "Long-term",
+    "Assignment Duration": "2 years",
+    "Job Title": "Senior Engineer"
+})
+
+_SAMPLE_CONVERSATION_HISTORY = tuple(MappingProxyType(message) for message in [
+    {"role": "user", "content": "I need help with a relocation from Chicago to London"},
+    {"role": "assistant", "content": "I can help with that. What's the employee's current salary?"},
+    {"role": "user", "content": "They make 100k per year"}
+])
 
 
 # ==============================================================================
 # OPENAI MOCK FIXTURES
 # ==============================================================================
 
-@pytest.fixture
+# Extraction result returned by the mock client, serialized once
+_MOCK_EXTRACTION_RESULT = json.dumps({
+    "extracted_fields": {
+        "Origin Location": "Chicago, USA",
+        "Destination Location": "London, UK",
+        "Current Compensation": "100,000 USD"
+    },
+    "confidence": {
+        "Origin Location": 0.95,
+        "Destination Location": 0.95,
+        "Current Compensation": 0.90
+    },
+    "missing_fields": ["Assignment Duration", "Job Level/Title"],
+    "clarifications_needed": []
+})
+
+# Mock replies keyed by prompt pattern; the first match wins
+_MOCK_REPLIES = [
+    (re.compile(r"compensation", re.IGNORECASE), "compensation analysis"),
+    (re.compile(r"policy", re.IGNORECASE), "policy analysis"),
+    (re.compile(r"extract information|extraction", re.IGNORECASE), _MOCK_EXTRACTION_RESULT),
+]
+
+
+@pytest.fixture(scope="module")
 def mock_openai_response():
     """Create a mock OpenAI API response."""
     def _create_response(content: str, model: str = "gpt-4o"):
-        response = Mock()
-        response.choices = [Mock()]
-        response.choices[0].message = Mock()
-        response.choices[0].message.content = content
-        response.model = model
-        return response
+        # Plain namespaces rather than Mock trees: only these attributes
+        # are read, and they are much cheaper to build and access
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            model=model
+        )
     return _create_response
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_openai_client(mock_openai_response):
-    """Create a mock AsyncOpenAI client."""
-    client = Mock()
-    client.chat = Mock()
-    client.chat.completions = Mock()
+    """
+    Create a mock AsyncOpenAI client, shared by every test in a module.
 
-    # Make create an async mock
+    Tests that swap out chat.completions.create must do so with
+    monkeypatch so the shared client is restored afterwards.
+    """
+    # Return different responses based on the prompt
     async def mock_create(*args, **kwargs):
-        # Return different responses based on the prompt
         messages = kwargs.get('messages', [])
-        if messages:
-            content = messages[-1].get('content', '')
-
-            # Handle routing responses
-            if 'compensation' in content.lower():
-                return mock_openai_response("compensation analysis")
-            elif 'policy' in content.lower():
-                return mock_openai_response("policy analysis")
-            elif 'extract information' in content.lower() or 'extraction' in content.lower():
-                # Return JSON for extraction
-                extraction_result = {
-                    "extracted_fields": {
-                        "Origin Location": "Chicago, USA",
-                        "Destination Location": "London, UK",
-                        "Current Compensation": "100,000 USD"
-                    },
-                    "confidence": {
-                        "Origin Location": 0.95,
-                        "Destination Location": 0.95,
-                        "Current Compensation": 0.90
-                    },
-                    "missing_fields": ["Assignment Duration", "Job Level/Title"],
-                    "clarifications_needed": []
-                }
-                return mock_openai_response(json.dumps(extraction_result))
-            else:
-                return mock_openai_response("Generic response")
+        if not messages:
+            return mock_openai_response("Default response")
 
-        return mock_openai_response("Default response")
+        content = messages[-1].get('content', '')
+        for pattern, reply in _MOCK_REPLIES:
+            if pattern.search(content):
+                return mock_openai_response(reply)
+        return mock_openai_response("Generic response")
 
-    client.chat.completions.create = mock_create
+    client = Mock()
+    client.chat.completions.create = AsyncMock(side_effect=mock_create)
     return client
 
 
@@ -88,7 +155,7 @@ def mock_openai_client(mock_openai_response):
 # ROUTER FIXTURES
 # ==============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_router_config():
     """Create mock router configuration."""
     return {
@@ -123,7 +190,7 @@ def mock_router_config():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_routing_queries():
     """Sample queries for routing tests."""
     return {
@@ -152,137 +219,178 @@ def sample_routing_queries():
     }
 
 
+@contextmanager
+def _patched_langchain():
+    """Patch the LangChain classes used by enhanced_agent_router with mocks."""
+    with patch('enhanced_agent_router.ChatOpenAI') as mock_chat, \
+         patch('enhanced_agent_router.LLMRouterChain') as mock_router, \
+         patch('enhanced_agent_router.LLMChain') as mock_chain:
+
+        # Setup mock ChatOpenAI
+        mock_chat_instance = MagicMock()
+        mock_chat.return_value = mock_chat_instance
+
+        # Setup mock router chain
+        mock_router_instance = MagicMock()
+        mock_router.from_llm.return_value = mock_router_instance
+
+        # Make invoke return proper structure
+        def mock_invoke(inputs):
+            query = inputs.get('input', '').lower()
+            if 'salary' in query or 'compensation' in query:
+                destination = 'compensation'
+            elif 'policy' in query or 'visa' in query:
+                destination = 'policy'
+            elif 'cheapest' in query or 'best' in query:
+                destination = 'both_policy_and_compensation'
+            else:
+                destination = 'guidance_fallback'
+
+            return {
+                'destination_and_inputs': {
+                    'destination': destination,
+                    'next_inputs': {'input': inputs['input']}
+                }
+            }
+
+        mock_router_instance.invoke = mock_invoke
+
+        # Setup mock LLM chains
+        mock_chain_instance = MagicMock()
+
+        def mock_chain_invoke(inputs):
+            return {'text': f"Response for: {inputs.get('input', '')}"}
+
+        mock_chain_instance.invoke = mock_chain_invoke
+        mock_chain.return_value = mock_chain_instance
+
+        yield {
+            'chat': mock_chat,
+            'router': mock_router,
+            'chain': mock_chain
+        }
+
+
+@pytest.fixture
+def mock_langchain():
+    """Mock LangChain components."""
+    with _patched_langchain() as mocks:
+        yield mocks
+
+
+@pytest.fixture(scope="session")
+def shared_router(mock_router_config):
+    """
+    EnhancedAgentRouter built once, from mock_router_config, for the session.
+
+    The router keeps no per-query state, so tests can share it; tests that
+    need to break a chain should use patch.object so it is restored. The
+    environment is only patched while the router is built, so the fake key
+    does not leak into other tests.
+    """
+    with _patched_langchain(), patch('builtins.open', create=True) as mock_file, \
+            patch.dict(os.environ, {'OPENAI_API_KEY': 'test-api-key'}):
+        mock_file.return_value.__enter__ = lambda self: self
+        mock_file.return_value.__exit__ = Mock()
+        mock_file.return_value.read.return_value = json.dumps(mock_router_config)
+
+        from enhanced_agent_router import EnhancedAgentRouter
+        return EnhancedAgentRouter(api_key="test-key")
+
+
 # ==============================================================================
 # COLLECTOR FIXTURES
 # ==============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_compensation_data():
-    """Sample compensation data for testing."""
-    return {
-        "Origin Location": "Chicago, USA",
-        "Destination Location": "London, UK",
-        "Current Compensation": "100,000 USD",
-        "Assignment Duration": "2 years",
-        "Job Level/Title": "Senior Engineer",
-        "Family Size": "2",
-        "Housing Preference": "Apartment"
-    }
+    """Sample compensation data for testing (read-only)."""
+    return _SAMPLE_COMPENSATION_DATA
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_policy_data():
-    """Sample policy data for testing."""
-    return {
-        "Origin Country": "United States",
-        "Destination Country": "United Kingdom",
-        "Assignment Type": "Long-term",
-        "Assignment Duration": "2 years",
-        "Job Title": "Senior Engineer"
-    }
+    """Sample policy data for testing (read-only)."""
+    return _SAMPLE_POLICY_DATA
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_conversation_history():
-    """Sample conversation history."""
-    return [
-        {"role": "user", "content": "I need help with a relocation from Chicago to London"},
-        {"role": "assistant", "content": "I can help with that. What's the employee's current salary?"},
-        {"role": "user", "content": "They make 100k per year"}
-    ]
+    """Sample conversation history (read-only)."""
+    return _SAMPLE_CONVERSATION_HISTORY
 
 
 # ==============================================================================
 # FILE PROCESSING FIXTURES
 # ==============================================================================
 
-@pytest.fixture
-def temp_pdf_file():
-    """Create a temporary PDF file for testing."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.pdf', delete=False) as f:
-        # Note: This creates a text file with .pdf extension for testing
-        # Real PDF processing would require PyMuPDF
-        f.write("Sample PDF content for testing")
-        temp_path = f.name
+@pytest.fixture(scope="session")
+def sample_files_dir(tmp_path_factory):
+    """Session-wide directory holding the sample input files."""
+    return tmp_path_factory.mktemp("data")
 
-    yield temp_path
 
-    # Cleanup
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+@pytest.fixture(scope="session")
+def temp_pdf_file(sample_files_dir):
+    """Create a temporary PDF file for testing."""
+    # Note: This creates a text file with .pdf extension for testing
+    # Real PDF processing would require PyMuPDF
+    path = sample_files_dir / "sample.pdf"
+    path.write_text("Sample PDF content for testing")
+    return str(path)
 
 
-@pytest.fixture
-def temp_txt_file():
+@pytest.fixture(scope="session")
+def temp_txt_file(sample_files_dir):
     """Create a temporary text file for testing."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-        f.write("Sample text content\nLine 2\nLine 3")
-        temp_path = f.name
-
-    yield temp_path
-
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+    path = sample_files_dir / "sample.txt"
+    path.write_text("Sample text content\nLine 2\nLine 3", encoding='utf-8')
+    return str(path)
 
 
-@pytest.fixture
-def temp_json_file():
+@pytest.fixture(scope="session")
+def temp_json_file(sample_files_dir):
     """Create a temporary JSON file for testing."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
-        json.dump({"test": "data", "nested": {"key": "value"}}, f)
-        temp_path = f.name
-
-    yield temp_path
-
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+    path = sample_files_dir / "sample.json"
+    path.write_text(json.dumps({"test": "data", "nested": {"key": "value"}}), encoding='utf-8')
+    return str(path)
 
 
-@pytest.fixture
-def temp_csv_file():
+@pytest.fixture(scope="session")
+def temp_csv_file(sample_files_dir):
     """Create a temporary CSV file for testing."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8', newline='') as f:
-        f.write("Name,Location,Salary\n")
-        f.write("John Doe,London,100000\n")
-        f.write("Jane Smith,Paris,120000\n")
-        temp_path = f.name
-
-    yield temp_path
-
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+    path = sample_files_dir / "sample.csv"
+    path.write_text(
+        "Name,Location,Salary\n"
+        "John Doe,London,100000\n"
+        "Jane Smith,Paris,120000\n",
+        encoding='utf-8',
+        newline=''
+    )
+    return str(path)
 
 
 # ==============================================================================
 # AUTHENTICATION FIXTURES
 # ==============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_users_db():
-    """Sample users database."""
-    return {
-        "admin": {
-            "password_hash": hashlib.sha256("admin123".encode()).hexdigest(),
-            "role": "admin",
-            "name": "Administrator",
-            "email": "admin@globaliq.com"
-        },
-        "hr_manager": {
-            "password_hash": hashlib.sha256("hr2024".encode()).hexdigest(),
-            "role": "hr_manager",
-            "name": "HR Manager",
-            "email": "hr@globaliq.com"
-        },
-        "employee": {
-            "password_hash": hashlib.sha256("employee123".encode()).hexdigest(),
-            "role": "employee",
-            "name": "Employee User",
-            "email": "employee@globaliq.com"
-        }
-    }
+    """Sample users database (read-only)."""
+    return _SAMPLE_USERS_DB
 
 
 @pytest.fixture
+def patched_users_db(sample_users_db):
+    """Swap main.USERS_DB for sample_users_db for the duration of a test."""
+    import main
+    saved = main.USERS_DB
+    main.USERS_DB = sample_users_db
+    yield sample_users_db
+    main.USERS_DB = saved
+
+
+@pytest.fixture(scope="session")
 def valid_credentials():
     """Valid username/password combinations."""
     return [
@@ -292,7 +400,7 @@ def valid_credentials():
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def invalid_credentials():
     """Invalid username/password combinations."""
     return [
@@ -367,68 +475,86 @@ def session_awaiting_confirmation():
 # INTEGRATION TEST FIXTURES
 # ==============================================================================
 
+class _MockUserSession:
+    """Minimal stand-in for chainlit's user_session."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class _MockMessage:
+    """Stand-in for cl.Message that records what main sends."""
+
+    def __init__(self, sent, content=""):
+        self._sent = sent
+        self.content = content
+
+    async def send(self):
+        self._sent.append(self.content)
+        return self
+
+    async def update(self):
+        return self
+
+    async def stream_token(self, token):
+        self.content += token
+
+
+@pytest.fixture
+def sent_messages(monkeypatch, mock_chainlit_session):
+    """
+    Point main's cl.Message and cl.user_session at in-memory stand-ins.
+
+    Returns the list of message contents sent, in order.
+    """
+    import main
+
+    sent = []
+    monkeypatch.setattr(main.cl, "Message", lambda content="", **kwargs: _MockMessage(sent, content))
+    monkeypatch.setattr(main.cl, "user_session", mock_chainlit_session)
+    return sent
+
+
 @pytest.fixture
 def mock_chainlit_message():
     """Mock chainlit message."""
-    message = Mock()
-    message.content = "Test message"
-    message.elements = []
-    return message
+    return SimpleNamespace(content="Test message", elements=[])
 
 
 @pytest.fixture
 def mock_chainlit_user():
     """Mock chainlit user."""
-    user = Mock()
-    user.identifier = "test_user"
-    user.metadata = {
-        "role": "hr_manager",
-        "name": "Test User",
-        "email": "test@globaliq.com",
-        "provider": "credentials"
-    }
-    return user
+    return SimpleNamespace(
+        identifier="test_user",
+        metadata={
+            "role": "hr_manager",
+            "name": "Test User",
+            "email": "test@globaliq.com",
+            "provider": "credentials"
+        }
+    )
 
 
 @pytest.fixture
 def mock_chainlit_session(mock_chainlit_user):
     """Mock chainlit user session."""
-    session_data = {
+    return _MockUserSession({
         "user": mock_chainlit_user,
         "history": [],
         "user_data": {}
-    }
-
-    def get(key, default=None):
-        return session_data.get(key, default)
-
-    def set_val(key, value):
-        session_data[key] = value
-
-    session = Mock()
-    session.get = get
-    session.set = set_val
-    session.data = session_data
-
-    return session
+    })
 
 
 # ==============================================================================
 # HELPER FIXTURES
 # ==============================================================================
 
-@pytest.fixture
-def captured_logs():
-    """Fixture to capture print statements and logs."""
-    logs = []
-
-    def capture(*args, **kwargs):
-        logs.append(' '.join(str(arg) for arg in args))
-
-    with patch('builtins.print', side_effect=capture):
-        yield logs
-
-
 @pytest.fixture
 def mock_env_vars():
     """Mock environment variables."""
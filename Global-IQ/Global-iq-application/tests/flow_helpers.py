@@ -0,0 +1,205 @@
+# tests/flow_helpers.py
+"""
+Shared data and helpers for the full-flow tests
+Used by test_full_flow.py (also runnable as a script) and test_scenarios.py,
+so neither has to import the other test module.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI
+
+from conversational_collector import CHAT_MODEL, FOLLOW_UP_INSTRUCTIONS
+
+# LLM responses from earlier runs, reused when the request is identical.
+# Off by default; set FLOW_TEST_CACHE=true or pass --cache to opt in
+CACHE_FILE = os.path.join(os.path.dirname(__file__), ".cache", "extractions.json")
+USE_CACHE = os.getenv("FLOW_TEST_CACHE", "false").lower() == "true" or "--cache" in sys.argv
+
+
+# Single-turn scenarios with the fields each one should yield
+SCENARIOS = [
+    {
+        "name": "Minimal Info",
+        "query": "moving someone from chicago to mumbai",
+        "expected": {
+            "Origin Location": "Chicago",
+            "Destination Location": "Mumbai"
+        }
+    },
+    {
+        "name": "Moderate Info",
+        "query": "moving someone from chicago to mumbai making 100k for 2 years",
+        "expected": {
+            "Origin Location": "Chicago",
+            "Destination Location": "Mumbai",
+            "Current Compensation": "100",
+            "Assignment Duration": "2 years"
+        }
+    },
+    {
+        "name": "Complete Info",
+        "query": "Senior Engineer making $120k in Chicago moving to Mumbai for 2 years with family of 3, prefer company housing",
+        "expected": {
+            "Origin Location": "Chicago",
+            "Destination Location": "Mumbai",
+            "Current Compensation": "120",
+            "Assignment Duration": "2 years",
+            "Job Level/Title": "Senior Engineer",
+            "Family Size": "3",
+            "Housing Preference": "company"
+        }
+    },
+    {
+        "name": "Informal Language",
+        "query": "we got someone going from SF to Tokyo, they make like 180k, gonna be there 18 months",
+        "expected": {
+            "Origin Location": "SF",
+            "Destination Location": "Tokyo",
+            "Current Compensation": "180",
+            "Assignment Duration": "18 months"
+        }
+    },
+    {
+        "name": "Currency Variations",
+        "query": "Employee in London (£80k) relocating to New York for 1 year",
+        "expected": {
+            "Origin Location": "London",
+            "Destination Location": "New York",
+            "Current Compensation": "80",
+            "Assignment Duration": "1 year"
+        }
+    },
+    {
+        "name": "Family Details",
+        "query": "moving manager from Berlin to Singapore, 2 kids, spouse coming along",
+        "expected": {
+            "Origin Location": "Berlin",
+            "Destination Location": "Singapore",
+            "Family Size": "4"  # employee + spouse + 2 kids
+        }
+    },
+    {
+        "name": "Abbreviations",
+        "query": "SVP making 250k USD relocating CHI to LON 24mo",
+        "expected": {
+            "Job Level/Title": "SVP",
+            "Current Compensation": "250",
+            "Origin Location": "CHI",
+            "Destination Location": "LON",
+            "Assignment Duration": "24"
+        }
+    },
+    {
+        "name": "Missing Critical Info",
+        "query": "need to relocate someone",
+        "expected": {}
+    },
+    {
+        "name": "Ambiguous Family Size",
+        "query": "moving from Paris to Dubai with wife and 2 children",
+        "expected": {
+            "Origin Location": "Paris",
+            "Destination Location": "Dubai",
+            "Family Size": "4"
+        }
+    }
+]
+
+# Inputs that are not ordinary relocation descriptions
+EDGE_CASES = [
+    "What's the cheapest place to send someone?",  # Question instead of statement
+    "We need help with relocation",  # Vague request
+    "100k chicago mumbai 2yr fam3 eng corp",  # Ultra compressed
+    "",  # Empty string
+]
+
+
+@lru_cache(maxsize=1)
+def get_client():
+    """
+    OpenAI client shared by everything in this process
+
+    Uses a pooled HTTP/2 connection so concurrent scenarios multiplex over a
+    few sockets instead of opening one each.
+    """
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    )
+
+
+def _load_cache():
+    """Read cached extractions and follow-ups saved by a previous run"""
+    if not USE_CACHE:
+        return {}, {}
+    try:
+        with open(CACHE_FILE, "r") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}, {}
+    return data.get("extractions", {}), data.get("follow_ups", {})
+
+
+_EXTRACTION_CACHE, _FOLLOWUP_CACHE = _load_cache()
+
+
+@atexit.register
+def _save_cache():
+    """Persist the response caches for the next run"""
+    if not USE_CACHE or not (_EXTRACTION_CACHE or _FOLLOWUP_CACHE):
+        return
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with open(CACHE_FILE, "w") as f:
+        json.dump({"extractions": _EXTRACTION_CACHE, "follow_ups": _FOLLOWUP_CACHE}, f)
+
+
+def _cache_key(*parts):
+    """Stable hash of the inputs that determine an LLM response"""
+    return hashlib.sha256(
+        "|".join(json.dumps(part, sort_keys=True) for part in parts).encode()
+    ).hexdigest()
+
+
+async def cached_extract(collector, route, user_message, conversation_history):
+    """extract_information, served from the response cache when enabled"""
+    if USE_CACHE:
+        # Keyed on the full request (model, rendered prompt, settings) so
+        # changing any of them invalidates old entries
+        key = _cache_key(collector.build_extraction_request(route, user_message, conversation_history))
+        if key in _EXTRACTION_CACHE:
+            return _EXTRACTION_CACHE[key]
+    result = await collector.extract_information(
+        route=route,
+        user_message=user_message,
+        conversation_history=conversation_history
+    )
+    if USE_CACHE:
+        _EXTRACTION_CACHE[key] = result
+    return result
+
+
+async def cached_follow_up(collector, route, extracted_data, missing_fields):
+    """generate_follow_up, served from the response cache when enabled"""
+    if USE_CACHE:
+        instructions = collector._follow_up_instructions.get(route) or FOLLOW_UP_INSTRUCTIONS
+        key = _cache_key(CHAT_MODEL, instructions, route, extracted_data, missing_fields)
+        if key in _FOLLOWUP_CACHE:
+            return _FOLLOWUP_CACHE[key]
+    result = await collector.generate_follow_up(
+        route=route,
+        extracted_data=extracted_data,
+        missing_fields=missing_fields
+    )
+    if USE_CACHE:
+        _FOLLOWUP_CACHE[key] = result
+    return result
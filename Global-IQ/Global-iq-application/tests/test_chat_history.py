@@ -0,0 +1,245 @@
+# tests/test_chat_history.py
+"""
+Unit tests for chat history persistence.
+Tests the per-chat message logs, legacy migration, batched index writes
+(and recovery of unflushed counts) and log compaction.
+"""
+
+import pytest
+import json
+import os
+from datetime import datetime, timezone
+
+import chat_history
+from chat_history import ChatHistoryManager
+
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    """Point CHAT_HISTORY_DIR at a fresh temporary directory."""
+    monkeypatch.setattr(chat_history, "CHAT_HISTORY_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def manager(history_dir):
+    """Chat history manager writing under history_dir."""
+    return ChatHistoryManager()
+
+
+def _read_index(history_dir, user_id):
+    """Load a user's index file straight from disk."""
+    with open(history_dir / f"{user_id}_chats.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestMessageRoundTrip:
+    """Test that messages written by one manager are read back by another."""
+
+    def test_messages_survive_reload(self, history_dir, manager):
+        """Test messages and index metadata round-trip through disk."""
+        chat_id = manager.create_new_chat("alice", title="Relocation")
+        manager.add_message_to_chat("alice", chat_id, "user", "Moving to London")
+        manager.add_message_to_chat("alice", chat_id, "assistant", "Noted", {"agent_type": "policy"})
+        manager.flush()
+
+        reloaded = ChatHistoryManager()
+        messages = reloaded.get_chat_messages("alice", chat_id)
+        chat = reloaded.get_chat("alice", chat_id)
+
+        assert [(m["role"], m["content"]) for m in messages] == [
+            ("user", "Moving to London"),
+            ("assistant", "Noted"),
+        ]
+        assert chat["title"] == "Relocation"
+        assert chat["metadata"]["message_count"] == 2
+        assert chat["metadata"]["last_agent_type"] == "policy"
+        assert "messages" not in chat
+
+    def test_messages_are_appended_one_per_line(self, history_dir, manager):
+        """Test that each message is one line of the chat's NDJSON log."""
+        chat_id = manager.create_new_chat("alice")
+        manager.add_message_to_chat("alice", chat_id, "user", "first")
+        manager.add_message_to_chat("alice", chat_id, "user", "second")
+
+        lines = (history_dir / "alice" / f"{chat_id}.ndjson").read_bytes().splitlines()
+
+        assert [json.loads(line)["content"] for line in lines] == ["first", "second"]
+
+
+class TestLegacyMigration:
+    """Test migration of index files that still hold messages inline."""
+
+    def test_inline_messages_move_to_log(self, history_dir):
+        """Test that inline messages are moved to a log and dropped from the index."""
+        legacy = {
+            "user_id": "bob",
+            "chats": {
+                "c1": {
+                    "id": "c1",
+                    "title": "Old chat",
+                    "type": "general",
+                    "created_at": "2024-01-01T00:00:00+00:00",
+                    "updated_at": "2024-01-01T00:00:00+00:00",
+                    "messages": [
+                        {"id": "m1", "role": "user", "content": "hello"},
+                        {"id": "m2", "role": "assistant", "content": "hi"}
+                    ],
+                    "metadata": {"message_count": 2, "last_agent_type": None}
+                }
+            },
+            "active_chat_id": "c1",
+            "created_at": "2024-01-01T00:00:00+00:00"
+        }
+        (history_dir / "bob_chats.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+        manager = ChatHistoryManager()
+        messages = manager.get_chat_messages("bob", "c1")
+
+        assert [m["content"] for m in messages] == ["hello", "hi"]
+        assert "messages" not in _read_index(history_dir, "bob")["chats"]["c1"]
+
+    def test_naive_timestamps_normalized_to_utc(self, history_dir):
+        """Test that legacy naive local timestamps are rewritten as UTC and sort with new chats."""
+        naive = "2024-01-01T09:30:00"
+        legacy = {
+            "user_id": "bob",
+            "chats": {
+                "c1": {
+                    "id": "c1",
+                    "title": "Old chat",
+                    "type": "general",
+                    "created_at": naive,
+                    "updated_at": naive,
+                    "messages": [{"id": "m1", "role": "user", "content": "hello", "timestamp": naive}],
+                    "metadata": {"message_count": 1, "last_agent_type": None}
+                }
+            },
+            "active_chat_id": "c1",
+            "created_at": naive
+        }
+        (history_dir / "bob_chats.json").write_text(json.dumps(legacy), encoding="utf-8")
+        expected = datetime.fromisoformat(naive).astimezone(timezone.utc).isoformat()
+
+        manager = ChatHistoryManager()
+        new_chat_id = manager.create_new_chat("bob")
+        chats = manager.list_user_chats("bob")
+
+        assert manager.get_chat("bob", "c1")["updated_at"] == expected
+        assert manager.get_chat_messages("bob", "c1")[0]["timestamp"] == expected
+        assert _read_index(history_dir, "bob")["created_at"] == expected
+        assert [chat["id"] for chat in chats] == [new_chat_id, "c1"]
+
+
+class TestBatchedFlush:
+    """Test that index updates are written to disk in batches."""
+
+    def test_index_written_after_n_messages(self, history_dir, manager, monkeypatch):
+        """Test the index is only rewritten once FLUSH_EVERY_N_MESSAGES is reached."""
+        monkeypatch.setattr(chat_history, "FLUSH_EVERY_N_MESSAGES", 3)
+        monkeypatch.setattr(chat_history, "FLUSH_INTERVAL_SECONDS", 3600)
+        chat_id = manager.create_new_chat("alice")
+
+        for text in ("one", "two"):
+            manager.add_message_to_chat("alice", chat_id, "user", text)
+        assert _read_index(history_dir, "alice")["chats"][chat_id]["metadata"]["message_count"] == 0
+
+        manager.add_message_to_chat("alice", chat_id, "user", "three")
+        assert _read_index(history_dir, "alice")["chats"][chat_id]["metadata"]["message_count"] == 3
+
+    def test_flush_writes_pending_changes(self, history_dir, manager):
+        """Test that flush persists changes below the batch threshold."""
+        chat_id = manager.create_new_chat("alice")
+        manager.add_message_to_chat("alice", chat_id, "user", "hello")
+
+        manager.flush()
+
+        assert _read_index(history_dir, "alice")["chats"][chat_id]["metadata"]["message_count"] == 1
+        assert not os.path.exists(history_dir / "alice_chats.json.tmp")
+
+    def test_unflushed_count_reconciled_on_load(self, history_dir, manager, monkeypatch):
+        """Test that a count left stale by a missed flush is corrected from the log."""
+        monkeypatch.setattr(chat_history, "FLUSH_INTERVAL_SECONDS", 3600)
+        chat_id = manager.create_new_chat("alice")
+        for text in ("one", "two"):
+            manager.add_message_to_chat("alice", chat_id, "user", text)
+        # Simulate a crash: the log has both messages, the index still says none
+        assert _read_index(history_dir, "alice")["chats"][chat_id]["metadata"]["message_count"] == 0
+
+        reloaded = ChatHistoryManager()
+        summary = reloaded.get_chat_summary("alice", chat_id)
+        last_timestamp = reloaded.get_chat_messages("alice", chat_id)[-1]["timestamp"]
+
+        assert summary["message_count"] == 2
+        assert summary["updated_at"] == last_timestamp
+        assert _read_index(history_dir, "alice")["chats"][chat_id]["metadata"]["message_count"] == 2
+
+
+class TestCompactUserLogs:
+    """Test removal of message logs left behind by deleted chats."""
+
+    def test_orphaned_logs_removed(self, history_dir, manager):
+        """Test that only logs without an index entry are removed."""
+        chat_id = manager.create_new_chat("alice")
+        manager.add_message_to_chat("alice", chat_id, "user", "keep me")
+        orphan = history_dir / "alice" / "deadbeef.ndjson"
+        orphan.write_bytes(b'{"role": "user", "content": "orphan"}\n')
+
+        removed = manager.compact_user_logs("alice")
+
+        assert removed == 1
+        assert not orphan.exists()
+        assert manager.get_chat_messages("alice", chat_id)[0]["content"] == "keep me"
+
+    def test_no_log_directory(self, manager):
+        """Test compaction for a user without any logs."""
+        assert manager.compact_user_logs("nobody") == 0
+
+
+class TestChatSummary:
+    """Test chat summaries used by the chat list."""
+
+    def test_summary_message_count_from_metadata(self, manager):
+        """Test that the summary reports the count kept in the chat metadata."""
+        chat_id = manager.create_new_chat("alice")
+        for text in ("one", "two"):
+            manager.add_message_to_chat("alice", chat_id, "user", text)
+
+        summary = manager.get_chat_summary("alice", chat_id)
+
+        assert summary["message_count"] == 2
+
+    def test_summary_preview_from_last_message(self, manager):
+        """Test that the preview is the truncated content of the last message."""
+        chat_id = manager.create_new_chat("alice")
+        manager.add_message_to_chat("alice", chat_id, "user", "first")
+        manager.add_message_to_chat("alice", chat_id, "assistant", "x" * 150)
+
+        summary = manager.get_chat_summary("alice", chat_id)
+
+        assert summary["last_message"] == "x" * 100 + "…"
+        assert summary["last_message_role"] == "assistant"
+
+    def test_summary_last_message_spanning_blocks(self, manager, monkeypatch):
+        """Test the tail read when the last line is longer than one read block."""
+        monkeypatch.setattr(chat_history, "LOG_TAIL_BLOCK_SIZE", 16)
+        chat_id = manager.create_new_chat("alice")
+        manager.add_message_to_chat("alice", chat_id, "user", "first")
+        manager.add_message_to_chat("alice", chat_id, "user", "a fairly long closing message")
+
+        summary = manager.get_chat_summary("alice", chat_id)
+
+        assert summary["last_message"] == "a fairly long closing message"
+
+    def test_summary_without_messages(self, manager):
+        """Test summary of a chat whose log has not been written yet."""
+        chat_id = manager.create_new_chat("alice")
+
+        summary = manager.get_chat_summary("alice", chat_id)
+
+        assert summary["last_message"] is None
+        assert summary["last_message_role"] is None
+
+    def test_summary_unknown_chat(self, manager):
+        """Test summary of a chat that does not exist."""
+        assert manager.get_chat_summary("alice", "missing") == {}
@@ -5,8 +5,23 @@ Tests data extraction, field validation, and completion checking.
 """
 
 import pytest
+import asyncio
 import json
-from unittest.mock import Mock, AsyncMock, patch
+import re
+
+from conversational_collector import ConversationalCollector
+
+# Words that show a confirmation message asks the user to verify the data
+_CONFIRM_RE = re.compile(r"correct|confirm|yes|verify", re.IGNORECASE)
+
+# Very long user message, built once for the whole module
+_LONG_MSG = "relocate " * 1000
+
+
+@pytest.fixture(scope="module")
+def collector(mock_openai_client):
+    """Collector shared by every test in this module."""
+    return ConversationalCollector(openai_client=mock_openai_client)
 
 
 class TestConversationalCollectorInitialization:
@@ -14,8 +29,6 @@ class TestConversationalCollectorInitialization:
 
     def test_collector_initializes_with_client(self, mock_openai_client):
         """Test collector initialization with OpenAI client."""
-        from conversational_collector import ConversationalCollector
-
         collector = ConversationalCollector(openai_client=mock_openai_client)
 
         assert collector.client is not None
@@ -25,8 +38,6 @@ class TestConversationalCollectorInitialization:
 
     def test_collector_has_required_fields(self, mock_openai_client):
         """Test that collector defines required fields for each route."""
-        from conversational_collector import ConversationalCollector
-
         collector = ConversationalCollector(openai_client=mock_openai_client)
 
         # Check compensation fields
@@ -45,50 +56,25 @@ class TestConversationalCollectorInitialization:
 class TestStartConversation:
     """Test starting conversation for different routes."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
     @pytest.mark.asyncio
-    async def test_start_conversation_compensation(self, collector):
-        """Test starting compensation conversation."""
-        result = await collector.start_conversation("compensation")
+    @pytest.mark.parametrize("route,expected_sub", [
+        ("compensation", "compensation"),
+        ("policy", "policy"),
+        ("unknown", None),
+    ], ids=["compensation", "policy", "unknown_route"])
+    async def test_start_conversation(self, collector, route, expected_sub):
+        """Test starting a conversation for each route."""
+        result = await collector.start_conversation(route)
 
-        assert result is not None
         assert isinstance(result, str)
-        assert "compensation" in result.lower()
         assert len(result) > 0
-
-    @pytest.mark.asyncio
-    async def test_start_conversation_policy(self, collector):
-        """Test starting policy conversation."""
-        result = await collector.start_conversation("policy")
-
-        assert result is not None
-        assert isinstance(result, str)
-        assert "policy" in result.lower()
-        assert len(result) > 0
-
-    @pytest.mark.asyncio
-    async def test_start_conversation_unknown_route(self, collector):
-        """Test starting conversation with unknown route."""
-        result = await collector.start_conversation("unknown")
-
-        assert result is not None
-        assert isinstance(result, str)
+        if expected_sub:
+            assert expected_sub in result.lower()
 
 
 class TestExtractInformation:
     """Test information extraction from user messages."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
     @pytest.mark.asyncio
     async def test_extract_information_basic(self, collector):
         """Test extracting information from basic user message."""
@@ -117,41 +103,25 @@ class TestExtractInformation:
         assert 'extracted_fields' in result
 
     @pytest.mark.asyncio
-    async def test_extract_information_compensation_route(self, collector):
-        """Test extraction for compensation route."""
-        user_message = "Moving senior engineer from NYC to Tokyo, current salary 120k USD, 3 year assignment"
-
-        result = await collector.extract_information("compensation", user_message)
-
-        assert 'extracted_fields' in result
-        extracted = result['extracted_fields']
-
-        # Should extract relevant fields
-        assert isinstance(extracted, dict)
-
-    @pytest.mark.asyncio
-    async def test_extract_information_policy_route(self, collector):
-        """Test extraction for policy route."""
-        user_message = "Need long-term assignment policy for USA to Germany transfer"
-
-        result = await collector.extract_information("policy", user_message)
+    @pytest.mark.parametrize("route,user_message", [
+        ("compensation", "Moving senior engineer from NYC to Tokyo, current salary 120k USD, 3 year assignment"),
+        ("policy", "Need long-term assignment policy for USA to Germany transfer"),
+    ], ids=["compensation", "policy"])
+    async def test_extract_information_route(self, collector, route, user_message):
+        """Test extraction for each route."""
+        result = await collector.extract_information(route, user_message)
 
         assert 'extracted_fields' in result
-        extracted = result['extracted_fields']
-        assert isinstance(extracted, dict)
+        assert isinstance(result['extracted_fields'], dict)
 
     @pytest.mark.asyncio
-    async def test_extract_information_handles_json_errors(self, collector):
+    async def test_extract_information_handles_json_errors(self, collector, mock_openai_response, monkeypatch):
         """Test that extraction handles malformed JSON gracefully."""
         # Mock the OpenAI client to return invalid JSON
         async def mock_create(*args, **kwargs):
-            response = Mock()
-            response.choices = [Mock()]
-            response.choices[0].message = Mock()
-            response.choices[0].message.content = "This is not valid JSON"
-            return response
+            return mock_openai_response("This is not valid JSON")
 
-        collector.client.chat.completions.create = mock_create
+        monkeypatch.setattr(collector.client.chat.completions, "create", mock_create)
 
         result = await collector.extract_information("compensation", "test message")
 
@@ -160,16 +130,33 @@ class TestExtractInformation:
         assert 'missing_fields' in result
         assert isinstance(result['extracted_fields'], dict)
 
+    @pytest.mark.asyncio
+    async def test_extract_information_caches_repeated_calls(self, collector, monkeypatch):
+        """Test that identical extraction requests reuse the cached result."""
+        calls = []
+        original_create = collector.client.chat.completions.create
+
+        async def counting_create(*args, **kwargs):
+            calls.append(kwargs)
+            return await original_create(*args, **kwargs)
+
+        monkeypatch.setattr(collector.client.chat.completions, "create", counting_create)
+
+        user_message = "Moving an engineer from the USA to Germany"
+        first = await collector.extract_information("policy", user_message)
+        first['extracted_fields'].clear()
+        second = await collector.extract_information("policy", user_message)
+
+        assert len(calls) == 1
+        assert second['extracted_fields']
+
+        await collector.extract_information("policy", "A different message")
+        assert len(calls) == 2
+
 
 class TestGenerateFollowUp:
     """Test follow-up question generation."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
     @pytest.mark.asyncio
     async def test_generate_follow_up_with_missing_fields(self, collector):
         """Test generating follow-up for missing fields."""
@@ -219,30 +206,61 @@ class TestGenerateFollowUp:
         # Should acknowledge what was captured
         assert "Chicago" in result or "Origin" in result or len(result) > 0
 
+    @pytest.mark.asyncio
+    async def test_generate_follow_up_static_prompt_prefix(self, collector, monkeypatch):
+        """Test that turn-specific data comes after a prompt prefix shared across turns."""
+        sent = []
+        original_create = collector.client.chat.completions.create
+
+        async def recording_create(*args, **kwargs):
+            sent.append(kwargs["messages"])
+            return await original_create(*args, **kwargs)
+
+        monkeypatch.setattr(collector.client.chat.completions, "create", recording_create)
+
+        await collector.generate_follow_up(
+            "compensation",
+            {"Origin Location": "Chicago, USA"},
+            ["Destination Location"]
+        )
+        await collector.generate_follow_up(
+            "compensation",
+            {"Origin Location": "Chicago, USA", "Destination Location": "London, UK"},
+            ["Current Compensation"]
+        )
+
+        assert sent[0][0] == sent[1][0]
+        assert sent[0][0]["role"] == "system"
+        assert "London, UK" not in sent[1][0]["content"]
+        assert "London, UK" in sent[1][-1]["content"]
+
 
 class TestIsComplete:
     """Test completion checking."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
-    def test_is_complete_all_fields_present(self, collector, sample_compensation_data):
+    @pytest.mark.parametrize("route,data_fixture", [
+        ("compensation", "sample_compensation_data"),
+        ("policy", "sample_policy_data"),
+    ], ids=["compensation", "policy"])
+    def test_is_complete_all_fields_present(self, collector, request, route, data_fixture):
         """Test completion with all required fields."""
-        result = collector.is_complete(sample_compensation_data, "compensation")
+        result = collector.is_complete(request.getfixturevalue(data_fixture), route)
 
         assert result is True
 
-    def test_is_complete_missing_fields(self, collector):
-        """Test completion with missing fields."""
-        partial_data = {
+    @pytest.mark.parametrize("route,partial_data", [
+        ("compensation", {
             "Origin Location": "Chicago, USA",
             "Destination Location": "London, UK"
-        }
-
-        result = collector.is_complete(partial_data, "compensation")
+        }),
+        ("policy", {
+            "Origin Country": "United States",
+            "Destination Country": "United Kingdom"
+        }),
+    ], ids=["compensation", "policy"])
+    def test_is_complete_missing_fields(self, collector, route, partial_data):
+        """Test completion with missing fields."""
+        result = collector.is_complete(partial_data, route)
 
         assert result is False
 
@@ -252,20 +270,11 @@ class TestIsComplete:
 
         assert result is False
 
-    def test_is_complete_policy_route(self, collector, sample_policy_data):
-        """Test completion for policy route."""
-        result = collector.is_complete(sample_policy_data, "policy")
+    def test_is_complete_blank_values(self, collector, sample_policy_data):
+        """Test that required fields with blank values do not count as collected."""
+        data = {**sample_policy_data, "Job Title": ""}
 
-        assert result is True
-
-    def test_is_complete_policy_route_incomplete(self, collector):
-        """Test completion for incomplete policy data."""
-        partial_data = {
-            "Origin Country": "United States",
-            "Destination Country": "United Kingdom"
-        }
-
-        result = collector.is_complete(partial_data, "policy")
+        result = collector.is_complete(data, "policy")
 
         assert result is False
 
@@ -273,12 +282,6 @@ class TestIsComplete:
 class TestGenerateConfirmationMessage:
     """Test confirmation message generation."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
     @pytest.mark.asyncio
     async def test_generate_confirmation_message(self, collector, sample_compensation_data):
         """Test generating confirmation message."""
@@ -289,10 +292,12 @@ class TestGenerateConfirmationMessage:
 
         assert result is not None
         assert isinstance(result, str)
-        # Should include all data fields
-        for value in sample_compensation_data.values():
-            if value:  # Skip empty values
-                assert value in result
+        # Should include all data fields; one pass finds every value present
+        values = {value for value in sample_compensation_data.values() if value}
+        # Longest first so a value like "2" cannot shadow "2 years"
+        pattern = "|".join(map(re.escape, sorted(values, key=len, reverse=True)))
+        found = set(re.findall(pattern, result))
+        assert values <= found, f"Missing from confirmation: {values - found}"
 
     @pytest.mark.asyncio
     async def test_generate_confirmation_asks_for_verification(self, collector, sample_compensation_data):
@@ -303,21 +308,15 @@ class TestGenerateConfirmationMessage:
         )
 
         # Should ask for confirmation
-        assert any(word in result.lower() for word in ['correct', 'confirm', 'yes', 'verify'])
+        assert _CONFIRM_RE.search(result) is not None
 
 
 class TestFormatForMCP:
     """Test formatting data for MCP server."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
     def test_format_for_mcp_compensation(self, collector, sample_compensation_data):
         """Test formatting compensation data for MCP."""
-        result = collector.format_for_mcp("compensation", sample_compensation_data)
+        result = collector.format_for_mcp("compensation", dict(sample_compensation_data))
 
         assert result is not None
         assert isinstance(result, dict)
@@ -326,7 +325,7 @@ class TestFormatForMCP:
 
     def test_format_for_mcp_policy(self, collector, sample_policy_data):
         """Test formatting policy data for MCP."""
-        result = collector.format_for_mcp("policy", sample_policy_data)
+        result = collector.format_for_mcp("policy", dict(sample_policy_data))
 
         assert result is not None
         assert isinstance(result, dict)
@@ -336,12 +335,6 @@ class TestFormatForMCP:
 class TestEdgeCases:
     """Test edge cases and error handling."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
-
     @pytest.mark.asyncio
     async def test_extract_information_empty_message(self, collector):
         """Test extracting from empty message."""
@@ -353,9 +346,7 @@ class TestEdgeCases:
     @pytest.mark.asyncio
     async def test_extract_information_very_long_message(self, collector):
         """Test extracting from very long message."""
-        long_message = "relocate " * 1000  # Very long message
-
-        result = await collector.extract_information("compensation", long_message)
+        result = await collector.extract_information("compensation", _LONG_MSG)
 
         assert result is not None
 
@@ -380,22 +371,20 @@ class TestEdgeCases:
 class TestIntegrationScenarios:
     """Test complete conversation scenarios."""
 
-    @pytest.fixture
-    def collector(self, mock_openai_client):
-        """Create collector instance."""
-        from conversational_collector import ConversationalCollector
-        return ConversationalCollector(openai_client=mock_openai_client)
+    # Runs on the session event loop (asyncio_default_test_loop_scope)
+    pytestmark = pytest.mark.asyncio
 
-    @pytest.mark.asyncio
+    @pytest.mark.slow
     async def test_full_compensation_conversation_flow(self, collector):
         """Test a complete compensation conversation flow."""
-        # Start conversation
-        start_msg = await collector.start_conversation("compensation")
-        assert start_msg is not None
-
-        # First user message - partial information
+        # Start conversation and process the first user message (partial
+        # information); neither depends on the other
         user_msg_1 = "I need to move someone from Chicago to London"
-        extraction_1 = await collector.extract_information("compensation", user_msg_1)
+        start_msg, extraction_1 = await asyncio.gather(
+            collector.start_conversation("compensation"),
+            collector.extract_information("compensation", user_msg_1)
+        )
+        assert start_msg is not None
         assert not collector.is_complete(extraction_1['extracted_fields'], "compensation")
 
         # Follow-up
@@ -406,16 +395,17 @@ class TestIntegrationScenarios:
         )
         assert follow_up_1 is not None
 
-    @pytest.mark.asyncio
+    @pytest.mark.slow
     async def test_full_policy_conversation_flow(self, collector):
         """Test a complete policy conversation flow."""
-        # Start conversation
-        start_msg = await collector.start_conversation("policy")
-        assert start_msg is not None
-
-        # User provides all information at once
+        # Start conversation while extracting the user's message, which
+        # provides all information at once
         user_msg = "Long-term assignment from USA to Germany for Senior Manager, 3 years"
-        extraction = await collector.extract_information("policy", user_msg)
+        start_msg, extraction = await asyncio.gather(
+            collector.start_conversation("policy"),
+            collector.extract_information("policy", user_msg)
+        )
+        assert start_msg is not None
 
         # Generate appropriate follow-up
         follow_up = await collector.generate_follow_up(
@@ -6,64 +6,16 @@ Tests keyword routing, LLM routing fallback, and route decisions.
 
 import pytest
 import json
-import os
-from unittest.mock import Mock, patch, MagicMock
-from langchain.schema import Document
-
-
-# Mock LangChain imports before importing the router
-@pytest.fixture(autouse=True)
-def mock_langchain():
-    """Mock LangChain components."""
-    with patch('enhanced_agent_router.ChatOpenAI') as mock_chat, \
-         patch('enhanced_agent_router.LLMRouterChain') as mock_router, \
-         patch('enhanced_agent_router.LLMChain') as mock_chain:
-
-        # Setup mock ChatOpenAI
-        mock_chat_instance = MagicMock()
-        mock_chat.return_value = mock_chat_instance
-
-        # Setup mock router chain
-        mock_router_instance = MagicMock()
-        mock_router.from_llm.return_value = mock_router_instance
-
-        # Make invoke return proper structure
-        def mock_invoke(inputs):
-            query = inputs.get('input', '').lower()
-            if 'salary' in query or 'compensation' in query:
-                destination = 'compensation'
-            elif 'policy' in query or 'visa' in query:
-                destination = 'policy'
-            elif 'cheapest' in query or 'best' in query:
-                destination = 'both_policy_and_compensation'
-            else:
-                destination = 'guidance_fallback'
-
-            return {
-                'destination_and_inputs': {
-                    'destination': destination,
-                    'next_inputs': {'input': inputs['input']}
-                }
-            }
-
-        mock_router_instance.invoke = mock_invoke
-
-        # Setup mock LLM chains
-        mock_chain_instance = MagicMock()
-
-        def mock_chain_invoke(inputs):
-            return {'text': f"Response for: {inputs.get('input', '')}"}
-
-        mock_chain_instance.invoke = mock_chain_invoke
-        mock_chain.return_value = mock_chain_instance
-
-        yield {
-            'chat': mock_chat,
-            'router': mock_router,
-            'chain': mock_chain
-        }
+from unittest.mock import Mock, patch
 
 
+@pytest.fixture
+def router(shared_router):
+    """Router instance shared across the session."""
+    return shared_router
+
+
+@pytest.mark.usefixtures("mock_langchain")
 class TestEnhancedAgentRouterInitialization:
     """Test router initialization."""
 
@@ -109,17 +61,6 @@ class TestEnhancedAgentRouterInitialization:
 class TestKeywordBasedRouting:
     """Test keyword-based routing logic."""
 
-    @pytest.fixture
-    def router(self, mock_env_vars, mock_router_config):
-        """Create router instance for testing."""
-        with patch('builtins.open', create=True) as mock_file:
-            mock_file.return_value.__enter__ = lambda self: self
-            mock_file.return_value.__exit__ = Mock()
-            mock_file.return_value.read.return_value = json.dumps(mock_router_config)
-
-            from enhanced_agent_router import EnhancedAgentRouter
-            return EnhancedAgentRouter(api_key="test-key")
-
     @pytest.mark.parametrize("query,expected_route", [
         ("What's the salary for this position?", "compensation"),
         ("Calculate my compensation package", "compensation"),
@@ -171,17 +112,6 @@ class TestKeywordBasedRouting:
 class TestLLMBasedRouting:
     """Test LLM-based routing for complex queries."""
 
-    @pytest.fixture
-    def router(self, mock_env_vars, mock_router_config):
-        """Create router instance for testing."""
-        with patch('builtins.open', create=True) as mock_file:
-            mock_file.return_value.__enter__ = lambda self: self
-            mock_file.return_value.__exit__ = Mock()
-            mock_file.return_value.read.return_value = json.dumps(mock_router_config)
-
-            from enhanced_agent_router import EnhancedAgentRouter
-            return EnhancedAgentRouter(api_key="test-key")
-
     @pytest.mark.parametrize("query,expected_route", [
         ("How much will I earn in London as a senior engineer?", "compensation"),
         ("What are the immigration requirements for Japan?", "policy"),
@@ -222,17 +152,6 @@ class TestLLMBasedRouting:
 class TestRouteDisplayInfo:
     """Test route display information retrieval."""
 
-    @pytest.fixture
-    def router(self, mock_env_vars, mock_router_config):
-        """Create router instance for testing."""
-        with patch('builtins.open', create=True) as mock_file:
-            mock_file.return_value.__enter__ = lambda self: self
-            mock_file.return_value.__exit__ = Mock()
-            mock_file.return_value.read.return_value = json.dumps(mock_router_config)
-
-            from enhanced_agent_router import EnhancedAgentRouter
-            return EnhancedAgentRouter(api_key="test-key")
-
     def test_get_route_display_info_valid_route(self, router):
         """Test getting display info for valid route."""
         info = router.get_route_display_info("compensation")
@@ -264,17 +183,6 @@ class TestRouteDisplayInfo:
 class TestRouteResponse:
     """Test getting responses from destination chains."""
 
-    @pytest.fixture
-    def router(self, mock_env_vars, mock_router_config):
-        """Create router instance for testing."""
-        with patch('builtins.open', create=True) as mock_file:
-            mock_file.return_value.__enter__ = lambda self: self
-            mock_file.return_value.__exit__ = Mock()
-            mock_file.return_value.read.return_value = json.dumps(mock_router_config)
-
-            from enhanced_agent_router import EnhancedAgentRouter
-            return EnhancedAgentRouter(api_key="test-key")
-
     def test_get_route_response_valid_destination(self, router):
         """Test getting response from valid destination."""
         result = router.get_route_response(
@@ -305,17 +213,6 @@ class TestRouteResponse:
 class TestProcessQuery:
     """Test complete query processing pipeline."""
 
-    @pytest.fixture
-    def router(self, mock_env_vars, mock_router_config):
-        """Create router instance for testing."""
-        with patch('builtins.open', create=True) as mock_file:
-            mock_file.return_value.__enter__ = lambda self: self
-            mock_file.return_value.__exit__ = Mock()
-            mock_file.return_value.read.return_value = json.dumps(mock_router_config)
-
-            from enhanced_agent_router import EnhancedAgentRouter
-            return EnhancedAgentRouter(api_key="test-key")
-
     def test_process_query_complete_pipeline(self, router):
         """Test complete query processing from routing to response."""
         result = router.process_query("What's the salary for London?")
@@ -343,17 +240,6 @@ class TestProcessQuery:
 class TestRoutingMethodTracking:
     """Test that routing method is properly tracked."""
 
-    @pytest.fixture
-    def router(self, mock_env_vars, mock_router_config):
-        """Create router instance for testing."""
-        with patch('builtins.open', create=True) as mock_file:
-            mock_file.return_value.__enter__ = lambda self: self
-            mock_file.return_value.__exit__ = Mock()
-            mock_file.return_value.read.return_value = json.dumps(mock_router_config)
-
-            from enhanced_agent_router import EnhancedAgentRouter
-            return EnhancedAgentRouter(api_key="test-key")
-
     def test_routing_method_keyword(self, router):
         """Test that keyword routing is tracked."""
         # Use a very specific keyword query
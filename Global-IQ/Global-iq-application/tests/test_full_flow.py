@@ -3,91 +3,204 @@
 """
 Comprehensive test of the conversational intake system
 Tests various scenarios and edge cases
+
+Meant to be run as a script; under pytest the same scenarios are covered
+item by item by test_scenarios.py.
+
+Pass --batch to submit the single-turn extractions as one OpenAI Batch API
+job instead of individual calls (cheaper, but results can take a while).
+Pass --cache (or set FLOW_TEST_CACHE=true) to reuse LLM responses saved by
+earlier runs when the request is unchanged.
 """
 
 import asyncio
+import io
+import json
 import sys
 import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
-
-from openai import AsyncOpenAI
+# pytest puts app/ and the project root on the path (pytest.ini, rootdir);
+# running this file directly needs them added
+if __name__ == "__main__":
+    _root = os.path.join(os.path.dirname(__file__), '..')
+    sys.path.insert(0, os.path.join(_root, 'app'))
+    sys.path.insert(0, _root)
+
+try:
+    import uvloop  # Optional: faster event loop (not available on Windows)
+except ImportError:
+    uvloop = None
 from dotenv import load_dotenv
 from conversational_collector import ConversationalCollector
+from tests.flow_helpers import (
+    SCENARIOS,
+    EDGE_CASES,
+    get_client,
+    cached_extract,
+    cached_follow_up
+)
 
 load_dotenv()
 
-async def test_scenario(collector, scenario_name, query, expected_fields=None):
-    """Test a single scenario"""
-    print(f"\n{'='*80}")
-    print(f"SCENARIO: {scenario_name}")
-    print(f"{'='*80}")
-    print(f"Query: \"{query}\"")
-    print()
+# Seconds between status checks while a --batch job is running
+BATCH_POLL_SECONDS = int(os.getenv("BATCH_POLL_SECONDS", "30"))
+
+
+def build_batch_jsonl(collector, requests):
+    """
+    Build a Batch API input file with one extraction request per query
+
+    Args:
+        collector: ConversationalCollector whose prompt is used
+        requests: (custom_id, user_message) pairs
+
+    Returns:
+        JSONL text for client.files.create(purpose="batch")
+    """
+    return "".join(
+        json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": collector.build_extraction_request("compensation", user_message)
+        }) + "\n"
+        for custom_id, user_message in requests
+    )
 
-    # Extract information
-    extraction = await collector.extract_information(
-        route="compensation",
-        user_message=query,
-        conversation_history=[]
+
+async def run_extraction_batch(client, collector, requests):
+    """
+    Run extraction requests through the OpenAI Batch API
+
+    Batch jobs are cheaper than individual calls but complete
+    asynchronously, so this polls until the job finishes.
+
+    Returns:
+        Dict of custom_id -> extraction result. Requests that failed are
+        left out so the caller can fall back to a live call.
+    """
+    batch_input = await client.files.create(
+        file=("extractions.jsonl", build_batch_jsonl(collector, requests).encode()),
+        purpose="batch"
     )
+    batch = await client.batches.create(
+        input_file_id=batch_input.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    print(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+        batch = await client.batches.retrieve(batch.id)
+        print(f"  Batch status: {batch.status}")
+
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"Batch {batch.id} ended with status '{batch.status}', using live calls instead")
+        return {}
+
+    output = await client.files.content(batch.output_file_id)
+    results = {}
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            continue
+        try:
+            results[item["custom_id"]] = json.loads(
+                response["body"]["choices"][0]["message"]["content"]
+            )
+        except (KeyError, IndexError, json.JSONDecodeError):
+            continue
+    return results
+
+
+async def run_scenario(collector, scenario_name, query, expected_fields=None, out=None, extraction=None):
+    """
+    Test a single scenario, writing its report to out (stdout by default)
+
+    A precomputed extraction (e.g. from a batch job) skips the extraction call.
+    """
+    lines = []
+    lines.append(f"\n{'='*80}")
+    lines.append(f"SCENARIO: {scenario_name}")
+    lines.append(f"{'='*80}")
+    lines.append(f"Query: \"{query}\"")
+    lines.append("")
 
-    print("EXTRACTED FIELDS:")
-    print("-" * 80)
+    # Extract information
+    if extraction is None:
+        extraction = await cached_extract(
+            collector,
+            route="compensation",
+            user_message=query,
+            conversation_history=[]
+        )
+
+    lines.append("EXTRACTED FIELDS:")
+    lines.append("-" * 80)
     for field, value in extraction["extracted_fields"].items():
         if value:
             confidence = extraction["confidence"].get(field, 0)
             status = "[+]" if confidence > 0.7 else "[?]"
-            print(f"  {status} {field}: {value} (confidence: {confidence:.2f})")
+            lines.append(f"  {status} {field}: {value} (confidence: {confidence:.2f})")
 
-    print(f"\nMISSING FIELDS: {len(extraction['missing_fields'])}")
+    lines.append(f"\nMISSING FIELDS: {len(extraction['missing_fields'])}")
     for field in extraction["missing_fields"]:
-        print(f"  [-] {field}")
+        lines.append(f"  [-] {field}")
 
     # Check completeness
     is_complete = collector.is_complete(extraction["extracted_fields"], "compensation")
 
     if not is_complete:
-        print("\n" + "-" * 80)
-        print("FOLLOW-UP MESSAGE:")
-        print("-" * 80)
-        follow_up = await collector.generate_follow_up(
+        lines.append("\n" + "-" * 80)
+        lines.append("FOLLOW-UP MESSAGE:")
+        lines.append("-" * 80)
+        follow_up = await cached_follow_up(
+            collector,
             route="compensation",
             extracted_data=extraction["extracted_fields"],
             missing_fields=extraction["missing_fields"]
         )
-        print(follow_up)
+        lines.append(follow_up)
     else:
-        print("\n[COMPLETE] ALL FIELDS EXTRACTED")
+        lines.append("\n[COMPLETE] ALL FIELDS EXTRACTED")
 
     # Validation
     if expected_fields:
-        print("\n" + "-" * 80)
-        print("VALIDATION:")
-        print("-" * 80)
+        lines.append("\n" + "-" * 80)
+        lines.append("VALIDATION:")
+        lines.append("-" * 80)
         for field, expected_value in expected_fields.items():
             actual_value = extraction["extracted_fields"].get(field)
             if actual_value and expected_value.lower() in actual_value.lower():
-                print(f"  [OK] {field}: PASS")
+                lines.append(f"  [OK] {field}: PASS")
             else:
-                print(f"  [FAIL] {field}: FAIL (expected '{expected_value}', got '{actual_value}')")
+                lines.append(f"  [FAIL] {field}: FAIL (expected '{expected_value}', got '{actual_value}')")
 
+    # Written in one go so concurrent scenarios never interleave mid-report
+    (out or sys.stdout).write("\n".join(lines) + "\n")
     return extraction
 
-async def test_multi_turn_conversation(collector):
-    """Test a multi-turn conversation"""
-    print(f"\n{'='*80}")
-    print(f"MULTI-TURN CONVERSATION TEST")
-    print(f"{'='*80}")
+async def run_multi_turn(collector, out=None):
+    """Test a multi-turn conversation, writing its report to out (stdout by default)"""
+    lines = []
+    lines.append(f"\n{'='*80}")
+    lines.append(f"MULTI-TURN CONVERSATION TEST")
+    lines.append(f"{'='*80}")
 
     conversation_history = []
     collected_data = {}
+    required = tuple(collector.required_fields["compensation"])
 
     # Turn 1
-    print("\nTURN 1:")
-    print("User: 'relocating from NYC to London'")
+    lines.append("\nTURN 1:")
+    lines.append("User: 'relocating from NYC to London'")
 
-    extraction = await collector.extract_information(
+    extraction = await cached_extract(
+        collector,
         route="compensation",
         user_message="relocating from NYC to London",
         conversation_history=conversation_history
@@ -99,20 +212,22 @@ async def test_multi_turn_conversation(collector):
 
     conversation_history.append({"role": "user", "content": "relocating from NYC to London"})
 
-    follow_up = await collector.generate_follow_up(
+    follow_up = await cached_follow_up(
+        collector,
         route="compensation",
         extracted_data=collected_data,
         missing_fields=extraction["missing_fields"]
     )
 
     conversation_history.append({"role": "assistant", "content": follow_up})
-    print(f"Bot: {follow_up}")
+    lines.append(f"Bot: {follow_up}")
 
     # Turn 2
-    print("\nTURN 2:")
-    print("User: 'salary is 150k, going for 3 years'")
+    lines.append("\nTURN 2:")
+    lines.append("User: 'salary is 150k, going for 3 years'")
 
-    extraction = await collector.extract_information(
+    extraction = await cached_extract(
+        collector,
         route="compensation",
         user_message="salary is 150k, going for 3 years",
         conversation_history=conversation_history
@@ -124,20 +239,25 @@ async def test_multi_turn_conversation(collector):
 
     conversation_history.append({"role": "user", "content": "salary is 150k, going for 3 years"})
 
-    if not collector.is_complete(collected_data, "compensation"):
-        follow_up = await collector.generate_follow_up(
+    filled = {field for field, value in collected_data.items() if value}
+    missing = [field for field in required if field not in filled]
+
+    if missing:
+        follow_up = await cached_follow_up(
+            collector,
             route="compensation",
             extracted_data=collected_data,
-            missing_fields=[f for f in collector.required_fields["compensation"].keys() if f not in collected_data or not collected_data[f]]
+            missing_fields=missing
         )
         conversation_history.append({"role": "assistant", "content": follow_up})
-        print(f"Bot: {follow_up}")
+        lines.append(f"Bot: {follow_up}")
 
     # Turn 3
-    print("\nTURN 3:")
-    print("User: 'Director level, solo, prefer serviced apartment'")
+    lines.append("\nTURN 3:")
+    lines.append("User: 'Director level, solo, prefer serviced apartment'")
 
-    extraction = await collector.extract_information(
+    extraction = await cached_extract(
+        collector,
         route="compensation",
         user_message="Director level, solo, prefer serviced apartment",
         conversation_history=conversation_history
@@ -147,14 +267,16 @@ async def test_multi_turn_conversation(collector):
         if value:
             collected_data[field] = value
 
-    print("\nFINAL COLLECTED DATA:")
-    print("-" * 80)
+    lines.append("\nFINAL COLLECTED DATA:")
+    lines.append("-" * 80)
     for field, value in collected_data.items():
         if value:
-            print(f"  • {field}: {value}")
+            lines.append(f"  • {field}: {value}")
 
     is_complete = collector.is_complete(collected_data, "compensation")
-    print(f"\nComplete: {'YES' if is_complete else 'NO'}")
+    lines.append(f"\nComplete: {'YES' if is_complete else 'NO'}")
+
+    (out or sys.stdout).write("\n".join(lines) + "\n")
 
 async def main():
     """Run all tests"""
@@ -163,139 +285,84 @@ async def main():
     print("="*80)
 
     # Initialize
-    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client()
     collector = ConversationalCollector(openai_client=client)
 
-    # Test scenarios
-    scenarios = [
-        {
-            "name": "Minimal Info",
-            "query": "moving someone from chicago to mumbai",
-            "expected": {
-                "Origin Location": "Chicago",
-                "Destination Location": "Mumbai"
-            }
-        },
-        {
-            "name": "Moderate Info",
-            "query": "moving someone from chicago to mumbai making 100k for 2 years",
-            "expected": {
-                "Origin Location": "Chicago",
-                "Destination Location": "Mumbai",
-                "Current Compensation": "100",
-                "Assignment Duration": "2 years"
-            }
-        },
-        {
-            "name": "Complete Info",
-            "query": "Senior Engineer making $120k in Chicago moving to Mumbai for 2 years with family of 3, prefer company housing",
-            "expected": {
-                "Origin Location": "Chicago",
-                "Destination Location": "Mumbai",
-                "Current Compensation": "120",
-                "Assignment Duration": "2 years",
-                "Job Level/Title": "Senior Engineer",
-                "Family Size": "3",
-                "Housing Preference": "company"
-            }
-        },
-        {
-            "name": "Informal Language",
-            "query": "we got someone going from SF to Tokyo, they make like 180k, gonna be there 18 months",
-            "expected": {
-                "Origin Location": "SF",
-                "Destination Location": "Tokyo",
-                "Current Compensation": "180",
-                "Assignment Duration": "18 months"
-            }
-        },
-        {
-            "name": "Currency Variations",
-            "query": "Employee in London (£80k) relocating to New York for 1 year",
-            "expected": {
-                "Origin Location": "London",
-                "Destination Location": "New York",
-                "Current Compensation": "80",
-                "Assignment Duration": "1 year"
-            }
-        },
-        {
-            "name": "Family Details",
-            "query": "moving manager from Berlin to Singapore, 2 kids, spouse coming along",
-            "expected": {
-                "Origin Location": "Berlin",
-                "Destination Location": "Singapore",
-                "Family Size": "4"  # employee + spouse + 2 kids
-            }
-        },
-        {
-            "name": "Abbreviations",
-            "query": "SVP making 250k USD relocating CHI to LON 24mo",
-            "expected": {
-                "Job Level/Title": "SVP",
-                "Current Compensation": "250",
-                "Origin Location": "CHI",
-                "Destination Location": "LON",
-                "Assignment Duration": "24"
-            }
-        },
-        {
-            "name": "Missing Critical Info",
-            "query": "need to relocate someone",
-            "expected": {}
-        },
-        {
-            "name": "Ambiguous Family Size",
-            "query": "moving from Paris to Dubai with wife and 2 children",
-            "expected": {
-                "Origin Location": "Paris",
-                "Destination Location": "Dubai",
-                "Family Size": "4"
-            }
-        }
-    ]
-
-    # Run single-turn scenarios
-    for scenario in scenarios:
-        await test_scenario(
+    # With --batch, single-turn extractions are submitted as one Batch API job
+    batch_results = {}
+    if "--batch" in sys.argv:
+        batch_results = await run_extraction_batch(
+            client,
             collector,
-            scenario["name"],
-            scenario["query"],
-            scenario.get("expected")
+            [(s["name"], s["query"]) for s in SCENARIOS]
+            + [(f"edge-case-{i}", e) for i, e in enumerate(EDGE_CASES, 1)]
         )
-        await asyncio.sleep(1)  # Rate limiting
+
+    # Scenarios are independent, so run them concurrently; the semaphore
+    # keeps the number of in-flight API calls under the rate limit
+    sem = asyncio.Semaphore(int(os.getenv("TEST_CONCURRENCY", "8")))
+
+    async def report_scenario(scenario):
+        buffer = io.StringIO()
+        async with sem:
+            await run_scenario(
+                collector,
+                scenario["name"],
+                scenario["query"],
+                scenario.get("expected"),
+                out=buffer,
+                extraction=batch_results.get(scenario["name"])
+            )
+        return buffer.getvalue()
+
+    # Run single-turn scenarios, printing reports in scenario order
+    for report in await asyncio.gather(*(report_scenario(s) for s in SCENARIOS)):
+        print(report, end="")
+
+    async def report_edge_case(i, edge_case):
+        extraction = batch_results.get(f"edge-case-{i}")
+        if extraction is None:
+            async with sem:
+                try:
+                    extraction = await cached_extract(
+                        collector,
+                        route="compensation",
+                        user_message=edge_case,
+                        conversation_history=[]
+                    )
+                except Exception as e:
+                    return f"  ERROR: {e}"
+        extracted_count = sum(1 for v in extraction["extracted_fields"].values() if v)
+        return f"  Extracted {extracted_count} fields"
+
+    async def report_multi_turn():
+        # Turns depend on each other, so they stay sequential within this task
+        buffer = io.StringIO()
+        await run_multi_turn(collector, out=buffer)
+        return buffer.getvalue()
+
+    # Multi-turn conversation and edge cases run side by side
+    multi_turn_report, edge_results = await asyncio.gather(
+        report_multi_turn(),
+        asyncio.gather(*(report_edge_case(i, e) for i, e in enumerate(EDGE_CASES, 1)))
+    )
 
     # Test multi-turn conversation
-    await test_multi_turn_conversation(collector)
+    print(multi_turn_report, end="")
 
     # Test edge cases
     print(f"\n{'='*80}")
     print("EDGE CASES")
     print(f"{'='*80}")
 
-    edge_cases = [
-        "What's the cheapest place to send someone?",  # Question instead of statement
-        "We need help with relocation",  # Vague request
-        "100k chicago mumbai 2yr fam3 eng corp",  # Ultra compressed
-        "",  # Empty string
-    ]
-
-    for i, edge_case in enumerate(edge_cases, 1):
+    for i, (edge_case, result) in enumerate(zip(EDGE_CASES, edge_results), 1):
         print(f"\nEDGE CASE {i}: \"{edge_case}\"")
-        try:
-            extraction = await collector.extract_information(
-                route="compensation",
-                user_message=edge_case,
-                conversation_history=[]
-            )
-            extracted_count = sum(1 for v in extraction["extracted_fields"].values() if v)
-            print(f"  Extracted {extracted_count} fields")
-        except Exception as e:
-            print(f"  ERROR: {e}")
+        print(result)
 
     print("\n" + "="*80)
     print("TESTING COMPLETE")
     print("="*80)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop else None) as runner:
+        runner.run(main())
@@ -7,7 +7,6 @@ Tests question loading, answer processing, and collection flow.
 import pytest
 import os
 import tempfile
-from unittest.mock import Mock, AsyncMock, patch
 
 
 class TestInputCollectorInitialization:
@@ -312,17 +311,13 @@ class TestAISpellCheckAndCorrect:
         return InputCollector(openai_client=mock_openai_client)
 
     @pytest.mark.asyncio
-    async def test_ai_spell_check_with_client(self, collector):
+    async def test_ai_spell_check_with_client(self, collector, mock_openai_response, monkeypatch):
         """Test spell checking with OpenAI client."""
         # Mock the response
         async def mock_create(*args, **kwargs):
-            response = Mock()
-            response.choices = [Mock()]
-            response.choices[0].message = Mock()
-            response.choices[0].message.content = "CORRECTED: London, UK\nSUGGESTIONS: Fixed spelling"
-            return response
+            return mock_openai_response("CORRECTED: London, UK\nSUGGESTIONS: Fixed spelling")
 
-        collector.openai_client.chat.completions.create = mock_create
+        monkeypatch.setattr(collector.openai_client.chat.completions, "create", mock_create)
 
         corrected, suggestions = await collector.ai_spell_check_and_correct(
             "londn",
@@ -333,16 +328,12 @@ class TestAISpellCheckAndCorrect:
         assert len(suggestions) > 0
 
     @pytest.mark.asyncio
-    async def test_ai_spell_check_no_changes(self, collector):
+    async def test_ai_spell_check_no_changes(self, collector, mock_openai_response, monkeypatch):
         """Test spell checking when no changes needed."""
         async def mock_create(*args, **kwargs):
-            response = Mock()
-            response.choices = [Mock()]
-            response.choices[0].message = Mock()
-            response.choices[0].message.content = "CORRECTED: London, UK\nSUGGESTIONS: None"
-            return response
+            return mock_openai_response("CORRECTED: London, UK\nSUGGESTIONS: None")
 
-        collector.openai_client.chat.completions.create = mock_create
+        monkeypatch.setattr(collector.openai_client.chat.completions, "create", mock_create)
 
         corrected, suggestions = await collector.ai_spell_check_and_correct(
             "London, UK",
@@ -1,116 +1,164 @@
 """
 Direct test of MCP servers without AGNO
 Use this to verify MCP servers are working before testing AGNO integration
+
+Run it as a script; the check_* helpers report on the servers rather than
+assert, so pytest does not collect them.
 """
 
-import requests
+import asyncio
+import io
 import json
-
-def test_compensation_server():
-    """Test compensation MCP server directly"""
-    print("\n" + "="*60)
-    print("Testing Compensation MCP Server (port 8081)")
-    print("="*60)
+import sys
+
+import httpx
+
+try:
+    import orjson  # Optional: much faster JSON encode/decode
+except ImportError:
+    orjson = None
+
+# Keep-alive pool shared by both server checks
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=16)
+
+COMPENSATION_PAYLOAD = {
+    "origin_location": "New York, USA",
+    "destination_location": "London, UK",
+    "current_salary": 100000,
+    "currency": "USD",
+    "assignment_duration": "12 months",
+    "job_level": "Senior Engineer",
+    "family_size": 2,
+    "housing_preference": "Company-provided"
+}
+
+POLICY_PAYLOAD = {
+    "origin_country": "USA",
+    "destination_country": "UK",
+    "assignment_type": "Long-term",
+    "duration": "24 months",
+    "job_title": "Software Engineer"
+}
+
+
+def _dumps(obj, pretty=False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, indent=2 if pretty else None).encode("utf-8")
+
+
+# Request bodies and their printed form, serialized once at import
+JSON_HEADERS = {"Content-Type": "application/json"}
+COMPENSATION_BODY = _dumps(COMPENSATION_PAYLOAD)
+COMPENSATION_PRETTY = _dumps(COMPENSATION_PAYLOAD, pretty=True).decode("utf-8")
+POLICY_BODY = _dumps(POLICY_PAYLOAD)
+POLICY_PRETTY = _dumps(POLICY_PAYLOAD, pretty=True).decode("utf-8")
+
+async def check_compensation_server(client=None, out=None):
+    """
+    Test compensation MCP server directly
+
+    Uses the given httpx.AsyncClient (a short-lived one if omitted) and
+    writes its report to out (stdout by default).
+    """
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await check_compensation_server(client, out)
+
+    print("\n" + "="*60, file=out)
+    print("Testing Compensation MCP Server (port 8081)", file=out)
+    print("="*60, file=out)
     
     url = "http://localhost:8081/predict_compensation"
     
-    payload = {
-        "origin_location": "New York, USA",
-        "destination_location": "London, UK",
-        "current_salary": 100000,
-        "currency": "USD",
-        "assignment_duration": "12 months",
-        "job_level": "Senior Engineer",
-        "family_size": 2,
-        "housing_preference": "Company-provided"
-    }
-    
     try:
-        print(f"\n[INFO] Sending request to {url}")
-        print(f"[INFO] Payload: {json.dumps(payload, indent=2)}")
+        print(f"\n[INFO] Sending request to {url}", file=out)
+        print(f"[INFO] Payload: {COMPENSATION_PRETTY}", file=out)
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = await client.post(url, content=COMPENSATION_BODY, headers=JSON_HEADERS)
         
         if response.status_code == 200:
             result = response.json()
-            print("\n[SUCCESS] Compensation server responded!")
-            print(f"\nTotal Package: ${result['predictions']['total_package']:,.2f}")
-            print(f"COLA Ratio: {result['predictions']['cola_ratio']}")
-            print(f"Housing Allowance: ${result['predictions']['housing_allowance']:,.2f}")
-            print(f"Overall Confidence: {result['confidence_scores']['overall']*100:.1f}%")
-            print(f"\nRecommendations:")
+            print("\n[SUCCESS] Compensation server responded!", file=out)
+            print(f"\nTotal Package: ${result['predictions']['total_package']:,.2f}", file=out)
+            print(f"COLA Ratio: {result['predictions']['cola_ratio']}", file=out)
+            print(f"Housing Allowance: ${result['predictions']['housing_allowance']:,.2f}", file=out)
+            print(f"Overall Confidence: {result['confidence_scores']['overall']*100:.1f}%", file=out)
+            print(f"\nRecommendations:", file=out)
             for i, rec in enumerate(result['recommendations'], 1):
-                print(f"  {i}. {rec}")
+                print(f"  {i}. {rec}", file=out)
             return True
         else:
-            print(f"\n[ERROR] Server returned status code: {response.status_code}")
-            print(f"Response: {response.text}")
+            print(f"\n[ERROR] Server returned status code: {response.status_code}", file=out)
+            print(f"Response: {response.text}", file=out)
             return False
             
-    except requests.exceptions.ConnectionError:
-        print("\n[ERROR] Could not connect to compensation server")
-        print("Make sure the server is running:")
-        print("  python services/mcp_prediction_server/compensation_server.py")
+    except httpx.ConnectError:
+        print("\n[ERROR] Could not connect to compensation server", file=out)
+        print("Make sure the server is running:", file=out)
+        print("  python services/mcp_prediction_server/compensation_server.py", file=out)
         return False
     except Exception as e:
-        print(f"\n[ERROR] Unexpected error: {e}")
+        print(f"\n[ERROR] Unexpected error: {e}", file=out)
         return False
 
 
-def test_policy_server():
-    """Test policy MCP server directly"""
-    print("\n" + "="*60)
-    print("Testing Policy MCP Server (port 8082)")
-    print("="*60)
+async def check_policy_server(client=None, out=None):
+    """
+    Test policy MCP server directly
+
+    Uses the given httpx.AsyncClient (a short-lived one if omitted) and
+    writes its report to out (stdout by default).
+    """
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await check_policy_server(client, out)
+
+    print("\n" + "="*60, file=out)
+    print("Testing Policy MCP Server (port 8082)", file=out)
+    print("="*60, file=out)
     
     url = "http://localhost:8082/analyze_policy"
     
-    payload = {
-        "origin_country": "USA",
-        "destination_country": "UK",
-        "assignment_type": "Long-term",
-        "duration": "24 months",
-        "job_title": "Software Engineer"
-    }
-    
     try:
-        print(f"\n[INFO] Sending request to {url}")
-        print(f"[INFO] Payload: {json.dumps(payload, indent=2)}")
+        print(f"\n[INFO] Sending request to {url}", file=out)
+        print(f"[INFO] Payload: {POLICY_PRETTY}", file=out)
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = await client.post(url, content=POLICY_BODY, headers=JSON_HEADERS)
         
         if response.status_code == 200:
             result = response.json()
-            print("\n[SUCCESS] Policy server responded!")
+            print("\n[SUCCESS] Policy server responded!", file=out)
             
             visa = result['analysis']['visa_requirements']
-            print(f"\nVisa Type: {visa['visa_type']}")
-            print(f"Processing Time: {visa['processing_time']}")
-            print(f"Cost: {visa['cost']}")
+            print(f"\nVisa Type: {visa['visa_type']}", file=out)
+            print(f"Processing Time: {visa['processing_time']}", file=out)
+            print(f"Cost: {visa['cost']}", file=out)
             
             eligibility = result['analysis']['eligibility']
-            print(f"\nMeets Requirements: {eligibility['meets_requirements']}")
+            print(f"\nMeets Requirements: {eligibility['meets_requirements']}", file=out)
             
-            print(f"\nRecommendations:")
+            print(f"\nRecommendations:", file=out)
             for i, rec in enumerate(result['recommendations'], 1):
-                print(f"  {i}. {rec}")
+                print(f"  {i}. {rec}", file=out)
             return True
         else:
-            print(f"\n[ERROR] Server returned status code: {response.status_code}")
-            print(f"Response: {response.text}")
+            print(f"\n[ERROR] Server returned status code: {response.status_code}", file=out)
+            print(f"Response: {response.text}", file=out)
             return False
             
-    except requests.exceptions.ConnectionError:
-        print("\n[ERROR] Could not connect to policy server")
-        print("Make sure the server is running:")
-        print("  python services/mcp_prediction_server/policy_server.py")
+    except httpx.ConnectError:
+        print("\n[ERROR] Could not connect to policy server", file=out)
+        print("Make sure the server is running:", file=out)
+        print("  python services/mcp_prediction_server/policy_server.py", file=out)
         return False
     except Exception as e:
-        print(f"\n[ERROR] Unexpected error: {e}")
+        print(f"\n[ERROR] Unexpected error: {e}", file=out)
         return False
 
 
-def main():
+async def main():
     """Run all tests"""
     print("\n" + "="*60)
     print("MCP Server Direct Test")
@@ -124,11 +172,19 @@ def main():
     print("     python services/mcp_prediction_server/compensation_server.py")
     print("     python services/mcp_prediction_server/policy_server.py")
     
-    input("\nPress Enter to start tests...")
+    if "--interactive" in sys.argv:
+        input("\nPress Enter to start tests...")
     
-    # Run tests
-    comp_result = test_compensation_server()
-    policy_result = test_policy_server()
+    # Run both tests concurrently over one connection pool, then print
+    # their reports in order
+    comp_out, policy_out = io.StringIO(), io.StringIO()
+    async with httpx.AsyncClient(timeout=10, http2=True, limits=CLIENT_LIMITS) as client:
+        comp_result, policy_result = await asyncio.gather(
+            check_compensation_server(client, comp_out),
+            check_policy_server(client, policy_out)
+        )
+    print(comp_out.getvalue(), end="")
+    print(policy_out.getvalue(), end="")
     
     # Summary
     print("\n" + "="*60)
@@ -151,7 +207,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
 
 
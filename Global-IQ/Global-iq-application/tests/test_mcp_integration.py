@@ -3,18 +3,23 @@ Quick test script to verify MCP integration is working
 Run this before starting the full Chainlit app
 """
 
+import os
 import sys
-sys.path.insert(0, 'app')
+
+# pytest puts app/ on the path (pytest.ini); running this file directly needs it added
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
 
 import asyncio
+import pytest
 from service_manager import MCPServiceManager
 from openai import AsyncOpenAI
-import os
 from dotenv import load_dotenv
 
 # Load environment
 load_dotenv()
 
+@pytest.mark.asyncio
 async def test_integration():
     print("=" * 60)
     print("MCP Integration Test")
@@ -1,11 +1,13 @@
 """Quick test to verify MCP servers and environment setup"""
 import asyncio
 import os
+import pytest
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+@pytest.mark.asyncio
 async def test_basic():
     print("=" * 60)
     print("Testing Global IQ Setup")
@@ -0,0 +1,110 @@
+# tests/test_request_batcher.py
+"""
+Unit tests for the compensation request batcher.
+Tests batching of concurrent calls, immediate dispatch of lone calls,
+handling of short batch results and the client's /predict/batch fallback.
+"""
+
+import pytest
+import asyncio
+import json
+
+import httpx
+
+from agno_mcp_client import GlobalIQAgentSystem
+from service_manager import RequestBatcher
+
+
+class TestRequestBatcher:
+    """Test coalescing of concurrent submits into batched dispatches."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_a_batch(self):
+        """Test that calls submitted together are sent in one dispatch."""
+        batches = []
+
+        async def dispatch(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+
+        batcher = RequestBatcher(dispatch, batch_size=8, batch_window=0.05)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        await batcher.aclose()
+
+        assert results == [0, 2, 4]
+        assert batches == [[0, 1, 2]]
+
+    @pytest.mark.asyncio
+    async def test_lone_call_skips_window(self):
+        """Test that a single call is dispatched without waiting for the window."""
+        async def dispatch(items):
+            return items
+
+        batcher = RequestBatcher(dispatch, batch_size=8, batch_window=10)
+        result = await asyncio.wait_for(batcher.submit("solo"), timeout=1)
+        await batcher.aclose()
+
+        assert result == "solo"
+
+    @pytest.mark.asyncio
+    async def test_short_results_fail_remaining_callers(self):
+        """Test that callers without a result get an error instead of hanging."""
+        async def dispatch(items):
+            return items[:1]
+
+        batcher = RequestBatcher(dispatch, batch_size=8, batch_window=0.05)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True),
+            timeout=1
+        )
+        await batcher.aclose()
+
+        assert results[0] == 0
+        assert all(isinstance(r, RuntimeError) for r in results[1:])
+
+
+def _prediction_request(origin):
+    """Keyword arguments for one compensation prediction."""
+    return {"origin_location": origin, "destination_location": "London, UK", "current_salary": 100000}
+
+
+class TestCompensationBatchClient:
+    """Test the client side of /predict/batch."""
+
+    @staticmethod
+    def _agent_with(handler):
+        """Agent system whose HTTP client is served by handler."""
+        agent = GlobalIQAgentSystem()
+        agent._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_short_batch_response_falls_back_to_single_calls(self):
+        """Test that a batch body with the wrong length is not passed through."""
+        def handler(request):
+            if request.url.path == "/predict/batch":
+                return httpx.Response(200, json=[{"status": "success", "origin": "Paris"}])
+            origin = json.loads(request.content)["origin_location"]
+            return httpx.Response(200, json={"status": "success", "origin": origin})
+
+        agent = self._agent_with(handler)
+        results = await agent.predict_compensation_batch(
+            [_prediction_request("Chicago"), _prediction_request("Tokyo")]
+        )
+        await agent.aclose()
+
+        assert [r["origin"] for r in results] == ["Chicago", "Tokyo"]
+
+    @pytest.mark.asyncio
+    async def test_batch_response_used_when_complete(self):
+        """Test that a well-formed batch body is returned as is."""
+        def handler(request):
+            return httpx.Response(200, json=[{"n": 1}, {"n": 2}])
+
+        agent = self._agent_with(handler)
+        results = await agent.predict_compensation_batch(
+            [_prediction_request("Chicago"), _prediction_request("Tokyo")]
+        )
+        await agent.aclose()
+
+        assert results == [{"n": 1}, {"n": 2}]
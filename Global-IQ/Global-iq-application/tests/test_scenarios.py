@@ -0,0 +1,68 @@
+# tests/test_scenarios.py
+"""
+Live extraction tests for the full-flow scenarios.
+Each scenario and edge case from flow_helpers.py is its own test item, so
+the sweep can be spread across workers with pytest-xdist:
+
+    RUN_LIVE_TESTS=1 pytest tests/test_scenarios.py -n auto --dist=loadfile
+
+These tests call the real OpenAI API and are skipped unless RUN_LIVE_TESTS=1.
+Set FLOW_TEST_CACHE=true to reuse the response cache shared with test_full_flow.py.
+"""
+
+import os
+
+import pytest
+
+from conversational_collector import ConversationalCollector
+from tests.flow_helpers import SCENARIOS, EDGE_CASES, get_client, cached_extract
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.live,
+    pytest.mark.skipif(
+        os.getenv("RUN_LIVE_TESTS") != "1",
+        reason="Calls the OpenAI API; set RUN_LIVE_TESTS=1 to run"
+    ),
+]
+
+
+@pytest.fixture(scope="session")
+def collector():
+    """Collector backed by the shared OpenAI client, reusing its connections."""
+    return ConversationalCollector(openai_client=get_client())
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [(s["query"], s.get("expected", {})) for s in SCENARIOS],
+    ids=[s["name"] for s in SCENARIOS]
+)
+async def test_scenario_extraction(collector, query, expected):
+    """Test that each scenario yields its expected fields."""
+    extraction = await cached_extract(
+        collector,
+        route="compensation",
+        user_message=query,
+        conversation_history=[]
+    )
+
+    for field, expected_value in expected.items():
+        actual_value = extraction["extracted_fields"].get(field)
+        assert actual_value and expected_value.lower() in str(actual_value).lower(), (
+            f"{field}: expected '{expected_value}', got '{actual_value}'"
+        )
+
+
+@pytest.mark.parametrize("message", EDGE_CASES, ids=[f"edge_case_{i}" for i in range(1, len(EDGE_CASES) + 1)])
+async def test_edge_case_extraction(collector, message):
+    """Test that unusual input still produces a well-formed extraction."""
+    extraction = await cached_extract(
+        collector,
+        route="compensation",
+        user_message=message,
+        conversation_history=[]
+    )
+
+    assert isinstance(extraction["extracted_fields"], dict)
+    assert isinstance(extraction["missing_fields"], list)
@@ -0,0 +1,260 @@
+# tests/test_service_manager.py
+"""
+Unit tests for the MCP service manager.
+Tests the per-server circuit breaker, single-flight caching of fallback
+completions and the combined compensation and policy path, including
+main's combined-route handler, and shutdown of pooled resources.
+"""
+
+import pytest
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+from service_manager import CircuitBreaker, MCPServiceManager
+
+
+@pytest.fixture
+def fallback_manager():
+    """Service manager with MCP disabled, so every call uses the fallback."""
+    return MCPServiceManager(openai_client=Mock(), enable_mcp=False)
+
+
+class TestCircuitBreaker:
+    """Test when the per-server circuit breaker opens."""
+
+    def test_opens_at_threshold_within_window(self):
+        """Test that threshold failures inside the window open the circuit."""
+        breaker = CircuitBreaker("compensation", failure_threshold=3, window_seconds=60)
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.is_open()
+
+    def test_success_clears_failure_count(self):
+        """Test that a success in between resets the count toward the threshold."""
+        breaker = CircuitBreaker("compensation", failure_threshold=3, window_seconds=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert not breaker.is_open()
+
+    def test_failures_outside_window_not_counted(self, monkeypatch):
+        """Test that failures older than the window drop out of the count."""
+        now = [1000.0]
+        monkeypatch.setattr("service_manager.time.monotonic", lambda: now[0])
+        breaker = CircuitBreaker("compensation", failure_threshold=3, window_seconds=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        now[0] += 61
+        breaker.record_failure()
+
+        assert not breaker.is_open()
+
+
+def _stream_from(calls, release=None, fail=False):
+    """Stand-in for _stream_completion that counts calls and yields two chunks."""
+    async def stream(prompt, temperature):
+        calls.append(prompt)
+        yield "Hello, "
+        if release is not None:
+            await release.wait()
+        if fail:
+            raise RuntimeError("stream broke")
+        yield "world"
+    return stream
+
+
+async def _collect(manager, prompt):
+    """Concatenate everything _cached_completion yields for prompt."""
+    return "".join([chunk async for chunk in manager._cached_completion(prompt)])
+
+
+class TestCachedCompletion:
+    """Test caching of fallback GPT-4 completions."""
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_prompts_call_api_once(self, fallback_manager, monkeypatch):
+        """Test that concurrent identical prompts share one completion."""
+        calls = []
+        release = asyncio.Event()
+        monkeypatch.setattr(fallback_manager, "_stream_completion", _stream_from(calls, release))
+
+        first = asyncio.ensure_future(_collect(fallback_manager, "prompt"))
+        second = asyncio.ensure_future(_collect(fallback_manager, "prompt"))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(first, second) == ["Hello, world", "Hello, world"]
+        assert calls == ["prompt"]
+        assert fallback_manager._llm_inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_early_stop_still_caches_answer(self, fallback_manager, monkeypatch):
+        """Test that a consumer stopping early does not block identical prompts."""
+        calls = []
+        monkeypatch.setattr(fallback_manager, "_stream_completion", _stream_from(calls))
+
+        stream = fallback_manager._cached_completion("prompt")
+        assert await stream.__anext__() == "Hello, "
+        # Abandon the stream without closing it
+        del stream
+
+        assert await asyncio.wait_for(_collect(fallback_manager, "prompt"), timeout=1) == "Hello, world"
+        assert calls == ["prompt"]
+
+    @pytest.mark.asyncio
+    async def test_failed_completion_is_not_cached(self, fallback_manager, monkeypatch):
+        """Test that a failed stream raises and the next caller retries."""
+        calls = []
+        monkeypatch.setattr(fallback_manager, "_stream_completion", _stream_from(calls, fail=True))
+
+        with pytest.raises(RuntimeError):
+            await _collect(fallback_manager, "prompt")
+
+        monkeypatch.setattr(fallback_manager, "_stream_completion", _stream_from(calls))
+        assert await _collect(fallback_manager, "prompt") == "Hello, world"
+        assert len(calls) == 2
+
+
+def _mcp_manager(agent_system):
+    """Service manager wired to a stand-in AGNO client, with MCP healthy."""
+    manager = MCPServiceManager(openai_client=Mock(), enable_mcp=False)
+    manager.enable_mcp = True
+    manager.agent_system = agent_system
+    manager.health_monitor.check_health = AsyncMock(
+        return_value={"compensation_server": True, "policy_server": True}
+    )
+    return manager
+
+
+COMPENSATION_RESULT = {
+    "status": "success",
+    "predictions": {"total_package": 150000, "base_salary": 100000, "currency": "USD", "cola_ratio": 1.2},
+    "breakdown": {"cola_adjustment": 20000, "housing": 30000, "hardship": 0}
+}
+POLICY_RESULT = {"status": "success"}
+
+COLLECTED_DATA = {
+    "Origin Location": "Chicago, USA",
+    "Destination Location": "London, UK",
+    "Current Compensation": "$100,000",
+    "Origin Country": "USA",
+    "Destination Country": "UK"
+}
+
+
+class TestPredictBoth:
+    """Test the combined compensation and policy path."""
+
+    @pytest.mark.asyncio
+    async def test_both_results_from_one_health_check(self):
+        """Test that both analyses come back and share one health check."""
+        agent = Mock()
+        agent.predict_both = AsyncMock(return_value=(COMPENSATION_RESULT, POLICY_RESULT))
+        manager = _mcp_manager(agent)
+
+        compensation, policy = await manager.predict_both(COLLECTED_DATA)
+
+        assert "Compensation Calculation Results" in compensation
+        assert "Policy Analysis Results" in policy
+        manager.health_monitor.check_health.assert_awaited_once()
+        agent.predict_both.assert_awaited_once()
+        assert manager.stats["mcp_calls"] == 2
+
+    @pytest.mark.asyncio
+    async def test_mcp_calls_go_out_together(self):
+        """Test that both MCP calls are made through one AGNO predict_both."""
+        agent = Mock()
+        agent.predict_both = AsyncMock(return_value=(COMPENSATION_RESULT, POLICY_RESULT))
+        agent.analyze_policy = AsyncMock()
+        manager = _mcp_manager(agent)
+
+        await manager.predict_both(COLLECTED_DATA)
+
+        agent.predict_both.assert_awaited_once()
+        agent.analyze_policy.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_branch_falls_back_alone(self, monkeypatch):
+        """Test that an MCP error on one branch only sends that branch to fallback."""
+        agent = Mock()
+        agent.predict_both = AsyncMock(
+            return_value=(COMPENSATION_RESULT, {"status": "error", "error": "analysis_failed"})
+        )
+        manager = _mcp_manager(agent)
+
+        async def fallback_policy(*args, **kwargs):
+            yield "fallback policy"
+        monkeypatch.setattr(manager, "_fallback_policy", fallback_policy)
+
+        compensation, policy = await manager.predict_both(COLLECTED_DATA)
+
+        assert "Compensation Calculation Results" in compensation
+        assert policy == "fallback policy"
+        assert manager.stats["fallback_calls"] == 1
+
+
+class TestCombinedRouteHandler:
+    """Test that main's combined route runs both analyses through predict_both."""
+
+    @pytest.mark.asyncio
+    async def test_confirmed_combined_intake_sends_both_results(
+        self, sent_messages, mock_chainlit_session, monkeypatch
+    ):
+        """Test that confirming a combined intake sends both results from one health check."""
+        import main
+
+        agent = Mock()
+        agent.predict_both = AsyncMock(return_value=(COMPENSATION_RESULT, POLICY_RESULT))
+        manager = _mcp_manager(agent)
+        monkeypatch.setattr(main, "mcp_service_manager", manager)
+        mock_chainlit_session.set("user_data", {
+            "conversational_mode": True,
+            "current_route": "both_policy_and_compensation",
+            "collected_data": dict(COLLECTED_DATA),
+            "conversation_history": []
+        })
+
+        await main.handle_message(SimpleNamespace(content="yes", elements=[]))
+
+        assert len(sent_messages) == 2
+        assert "Compensation Calculation Results" in sent_messages[0]
+        assert "Policy Analysis Results" in sent_messages[1]
+        manager.health_monitor.check_health.assert_awaited_once()
+        assert mock_chainlit_session.get("user_data")["conversational_mode"] is False
+
+
+class TestAppShutdown:
+    """Test that main's shutdown hook releases the service manager's resources."""
+
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_service_manager_and_client(self, monkeypatch):
+        """Test that app shutdown closes the batcher/pool and the OpenAI client."""
+        import main
+
+        manager = Mock(aclose=AsyncMock())
+        client = Mock(close=AsyncMock())
+        monkeypatch.setattr(main, "mcp_service_manager", manager)
+        monkeypatch.setattr(main, "client", client)
+
+        await main.shutdown()
+
+        manager.aclose.assert_awaited_once()
+        client.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_aclose_stops_batcher_and_closes_pool(self):
+        """Test that aclose stops the batcher task and closes the AGNO HTTP client."""
+        manager = MCPServiceManager(openai_client=Mock())
+        http_client = manager.agent_system._get_client()
+        worker = asyncio.ensure_future(asyncio.sleep(3600))
+        manager._compensation_batcher._worker = worker
+
+        await manager.aclose()
+        await asyncio.sleep(0)
+
+        assert worker.cancelled()
+        assert http_client.is_closed